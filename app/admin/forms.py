@@ -1,10 +1,11 @@
 # app/admin/forms.py
 
 from flask_wtf import FlaskForm
-from wtforms import StringField, SubmitField, FormField, IntegerField, DateTimeField
-from wtforms.validators import DataRequired
+from wtforms import StringField, SubmitField, FormField, IntegerField, DateTimeField, SelectField, HiddenField
+from wtforms.validators import DataRequired, Optional
 from wtforms.ext.sqlalchemy.fields import QuerySelectField
-from ..models import Department, Role, Student
+from .. import refdata
+from ..models import Student
 
 class DepartmentForm(FlaskForm):
     """
@@ -12,6 +13,7 @@ class DepartmentForm(FlaskForm):
     """
     name = StringField('Name', validators=[DataRequired()])
     description = StringField('Description', validators=[DataRequired()])
+    version_id = HiddenField()
     submit = SubmitField('Submit')
 
 class RoleForm(FlaskForm):
@@ -20,18 +22,23 @@ class RoleForm(FlaskForm):
     """
     name = StringField('Name', validators=[DataRequired()])
     description = StringField('Description', validators=[DataRequired()])
+    version_id = HiddenField()
     submit = SubmitField('Submit')
 
 class EmployeeAssignForm(FlaskForm):
     """
     Form for admin to assign departments and roles to employees
     """
-    department = QuerySelectField(query_factory=lambda: Department.query.all(),
-                                  get_label="name")
-    role = QuerySelectField(query_factory=lambda: Role.query.all(),
-                            get_label="name")
+    department_id = SelectField('Department', coerce=int)
+    role_id = SelectField('Role', coerce=int)
+    version_id = HiddenField()
     submit = SubmitField('Submit')
 
+    def __init__(self, *args, **kwargs):
+        super(EmployeeAssignForm, self).__init__(*args, **kwargs)
+        data = refdata.current()
+        self.department_id.choices = refdata.choices(data.departments, 'name')
+        self.role_id.choices = refdata.choices(data.roles, 'name')
 
 class StudentForm(FlaskForm):
     """
@@ -39,19 +46,25 @@ class StudentForm(FlaskForm):
     """
     student_fname = StringField('First Name', validators=[DataRequired()])
     student_lname = StringField('Last Name_lname', validators=[DataRequired()])
-    student_number = IntegerField('Student Number', validators=[DataRequired()])
-    contact_mobile = IntegerField('Mobile Line', validators=[DataRequired()])
+    student_number = IntegerField('Student Number (leave blank to allocate)',
+                                  validators=[Optional()])
+    contact_mobile = StringField('Mobile Line', validators=[DataRequired()])
     contact_email = StringField('Email Address', validators=[DataRequired()])
+    version_id = HiddenField()
     submit = SubmitField('Submit')
 
 class CourseForm(FlaskForm):
     """
     Form for admin to assign students to a course for a given year
     """
-    student = QuerySelectField(query_factory=lambda: Student.query.all(),
+    student = QuerySelectField(query_factory=lambda: Student.live().all(),
                                   get_label="student_number")
-    department = QuerySelectField(query_factory=lambda: Department.query.all(),
-                                  get_label="name")
-    role = QuerySelectField(query_factory=lambda: Role.query.all(),
-                            get_label="name")
+    department_id = SelectField('Department', coerce=int)
+    role_id = SelectField('Role', coerce=int)
     submit = SubmitField('Submit')
+
+    def __init__(self, *args, **kwargs):
+        super(CourseForm, self).__init__(*args, **kwargs)
+        data = refdata.current()
+        self.department_id.choices = refdata.choices(data.departments, 'name')
+        self.role_id.choices = refdata.choices(data.roles, 'name')
@@ -1,12 +1,86 @@
 # app/admin/views.py
 
-from flask import abort, flash, redirect, render_template, url_for
+from flask import abort, flash, jsonify, redirect, render_template, request, session, url_for
 from flask_login import current_user, login_required
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
 from . import admin
-from .. import db
-from forms import DepartmentForm, EmployeeAssignForm, RoleForm, StudentForm, CourseForm
+from .. import changes, db, partitions, refdata
+from ..allocator import allocate_student_number, student_number_in_use
+from ..projections import COURSE_LIST, EMPLOYEE_LIST, STUDENT_LIST, project
+from ..streaming import ChunkedRows, stream_template
+from .forms import DepartmentForm, EmployeeAssignForm, RoleForm, StudentForm, CourseForm
 from ..models import Department, Employee, Role, Student, Course
 
+# student numbers tried before giving up on adding a student
+ALLOCATION_ATTEMPTS = 3
+
+
+def employee_counts(column):
+    """
+    Count employees per value of an Employee foreign key in one query
+    """
+    return dict(db.session.query(column, func.count(Employee.id))
+                .group_by(column))
+
+def same_value(current, submitted):
+    """
+    Compare a column value with submitted form data, which may have been
+    coerced to another type, e.g. an integer field on a string column
+    """
+    if current is None or submitted is None:
+        return current is submitted
+    return (current == submitted or
+            '{}'.format(current) == '{}'.format(submitted))
+
+def save_edit(obj, form, fields):
+    """
+    Copy form fields onto obj and commit, unless the row has changed since
+    the form was rendered
+
+    The form carries the version it was rendered from and the UPDATE only
+    matches that version, so no lock is held across the round trip.
+    Returns None once saved, or a list of (label, current value, submitted
+    value) for the fields that conflict. The list is empty when a unique
+    value is already taken; the field then carries the error.
+    """
+    if str(form.version_id.data) == str(obj.version_id):
+        for name in fields:
+            setattr(obj, name, getattr(form, name).data)
+        try:
+            db.session.commit()
+            return None
+        except StaleDataError:
+            # another edit committed after obj was loaded; the rollback
+            # expires obj so it is reloaded below
+            db.session.rollback()
+        except IntegrityError:
+            db.session.rollback()
+            for name in fields:
+                field = getattr(form, name)
+                column = getattr(type(obj), name).property.columns[0]
+                if column.unique and not same_value(getattr(obj, name),
+                                                    field.data):
+                    field.errors = list(field.errors) + [
+                        'This value is already in use.']
+            return []
+
+    conflict = []
+    for name in fields:
+        field = getattr(form, name)
+        current = getattr(obj, name)
+        if not same_value(current, field.data):
+            choices = dict(getattr(field, 'choices', None) or ())
+            conflict.append((field.label.text,
+                             choices.get(current, current),
+                             choices.get(field.data, field.data)))
+    if not conflict:
+        return None
+
+    # submitting again overwrites the current version
+    form.version_id.data = obj.version_id
+    return conflict
 
 def check_admin():
     """
@@ -15,6 +89,22 @@ def check_admin():
     if not current_user.is_admin:
         abort(403)
 
+def delete_or_404(model, id):
+    """
+    Delete a row with a single DELETE statement
+
+    Dependent rows are left to the database's ON DELETE rules, so child
+    collections are never loaded into the session.
+    """
+    if db.session.query(model.id).filter_by(id=id).scalar() is None:
+        abort(404)
+
+    changes.touch_referencing(db.session, model, id)
+    model.query.filter_by(id=id).delete(synchronize_session=False)
+    if refdata.is_reference(model):
+        refdata.bump_version(db.session)
+    db.session.commit()
+
 # Department Views
 
 @admin.route('/departments', methods=['GET', 'POST'])
@@ -25,10 +115,12 @@ def list_departments():
     """
     check_admin()
 
-    departments = Department.query.all()
+    departments = refdata.current().departments.values()
 
     return render_template('admin/departments/departments.html',
-                           departments=departments, title="Departments")
+                           departments=departments,
+                           employee_counts=employee_counts(Employee.department_id),
+                           title="Departments")
 
 @admin.route('/departments/add', methods=['GET', 'POST'])
 @login_required
@@ -73,20 +165,19 @@ def edit_department(id):
 
     department = Department.query.get_or_404(id)
     form = DepartmentForm(obj=department)
+    conflict = None
     if form.validate_on_submit():
-        department.name = form.name.data
-        department.description = form.description.data
-        db.session.commit()
-        flash('You have successfully edited the department.')
+        conflict = save_edit(department, form, ('name', 'description'))
+        if conflict is None:
+            flash('You have successfully edited the department.')
 
-        # redirect to the departments page
-        return redirect(url_for('admin.list_departments'))
+            # redirect to the departments page
+            return redirect(url_for('admin.list_departments'))
 
-    form.description.data = department.description
-    form.name.data = department.name
     return render_template('admin/departments/department.html', action="Edit",
                            add_department=add_department, form=form,
-                           department=department, title="Edit Department")
+                           department=department, conflict=conflict,
+                           title="Edit Department")
 
 @admin.route('/departments/delete/<int:id>', methods=['GET', 'POST'])
 @login_required
@@ -96,9 +187,7 @@ def delete_department(id):
     """
     check_admin()
 
-    department = Department.query.get_or_404(id)
-    db.session.delete(department)
-    db.session.commit()
+    delete_or_404(Department, id)
     flash('You have successfully deleted the department.')
 
     # redirect to the departments page
@@ -115,9 +204,11 @@ def list_roles():
     """
     List all roles
     """
-    roles = Role.query.all()
+    roles = refdata.current().roles.values()
     return render_template('admin/roles/roles.html',
-                           roles=roles, title='Roles')
+                           roles=roles,
+                           employee_counts=employee_counts(Employee.role_id),
+                           title='Roles')
 
 @admin.route('/roles/add', methods=['GET', 'POST'])
 @login_required
@@ -162,20 +253,17 @@ def edit_role(id):
 
     role = Role.query.get_or_404(id)
     form = RoleForm(obj=role)
+    conflict = None
     if form.validate_on_submit():
-        role.name = form.name.data
-        role.description = form.description.data
-        db.session.add(role)
-        db.session.commit()
-        flash('You have successfully edited the role.')
+        conflict = save_edit(role, form, ('name', 'description'))
+        if conflict is None:
+            flash('You have successfully edited the role.')
 
-        # redirect to the roles page
-        return redirect(url_for('admin.list_roles'))
+            # redirect to the roles page
+            return redirect(url_for('admin.list_roles'))
 
-    form.description.data = role.description
-    form.name.data = role.name
     return render_template('admin/roles/role.html', add_role=add_role,
-                           form=form, title="Edit Role")
+                           form=form, conflict=conflict, title="Edit Role")
 
 @admin.route('/roles/delete/<int:id>', methods=['GET', 'POST'])
 @login_required
@@ -185,9 +273,7 @@ def delete_role(id):
     """
     check_admin()
 
-    role = Role.query.get_or_404(id)
-    db.session.delete(role)
-    db.session.commit()
+    delete_or_404(Role, id)
     flash('You have successfully deleted the role.')
 
     # redirect to the roles page
@@ -206,9 +292,10 @@ def list_employees():
     """
     check_admin()
 
-    employees = Employee.query.all()
-    return render_template('admin/employees/employees.html',
-                           employees=employees, title='Employees')
+    employees = project(Employee, EMPLOYEE_LIST).order_by(Employee.id)
+    return stream_template('admin/employees/employees.html',
+                           employees=ChunkedRows(employees),
+                           refdata=refdata.current(), title='Employees')
 
 @admin.route('/employees/assign/<int:id>', methods=['GET', 'POST'])
 @login_required
@@ -225,18 +312,17 @@ def assign_employee(id):
         abort(403)
 
     form = EmployeeAssignForm(obj=employee)
+    conflict = None
     if form.validate_on_submit():
-        employee.department = form.department.data
-        employee.role = form.role.data
-        db.session.add(employee)
-        db.session.commit()
-        flash('You have successfully assigned a department and role.')
+        conflict = save_edit(employee, form, ('department_id', 'role_id'))
+        if conflict is None:
+            flash('You have successfully assigned a department and role.')
 
-        # redirect to the roles page
-        return redirect(url_for('admin.list_employees'))
+            # redirect to the roles page
+            return redirect(url_for('admin.list_employees'))
 
     return render_template('admin/employees/employee.html',
-                           employee=employee, form=form,
+                           employee=employee, form=form, conflict=conflict,
                            title='Assign Employee')
 
 
@@ -252,9 +338,10 @@ def list_students():
     """
     List all students
     """
-    students = Student.query.all()
-    return render_template('admin/students/students.html',
-                           students=students, title='Students')
+    students = project(Student, STUDENT_LIST) \
+        .filter(Student.deleted_at.is_(None)).order_by(Student.id)
+    return stream_template('admin/students/students.html',
+                           students=ChunkedRows(students), title='Students')
 
 @admin.route('/students/add', methods=['GET', 'POST'])
 @login_required
@@ -268,20 +355,36 @@ def add_student():
 
     form = StudentForm()
     if form.validate_on_submit():
-        student = Student(student_fname=form.student_fname.data,student_lname=form.student_lname.data,
-                          student_number=form.student_number.data, contact_mobile=form.contact_mobile.data, contact_email=form.contact_email.data)
+        attempts = ALLOCATION_ATTEMPTS
+        # the unique index only covers the database the student goes to
+        if form.student_number.data is not None and \
+                student_number_in_use(form.student_number.data):
+            attempts = 0
+        for attempt in range(attempts):
+            student_number = form.student_number.data or allocate_student_number()
+            student = Student(student_fname=form.student_fname.data,student_lname=form.student_lname.data,
+                              student_number=student_number, contact_mobile=form.contact_mobile.data, contact_email=form.contact_email.data)
+
+            try:
+                # add student to the database
+                db.session.add(student)
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+                # an allocated number was typed in by hand meanwhile, so
+                # allocate another; a typed number is the user's to fix
+                if form.student_number.data is None:
+                    continue
+                break
 
-        try:
-            # add student to the database
-            db.session.add(student)
-            db.session.commit()
             flash('You have successfully added a new student.')
-        except:
-            # in case student name already exists
-            flash('Error: student name already exists.')
 
-        # redirect to the students page
-        return redirect(url_for('admin.list_students'))
+            # redirect to the students page
+            return redirect(url_for('admin.list_students'))
+
+        # in case student number already exists
+        form.student_number.errors = list(form.student_number.errors) + [
+            'This student number is already in use.']
 
     # load student template
     return render_template('admin/students/student.html', add_student=add_student,
@@ -297,28 +400,30 @@ def edit_student(id):
 
     add_student = False
 
-    student = Student.query.get_or_404(id)
+    student = Student.live().filter_by(id=id).first_or_404()
     form = StudentForm(obj=student)
+    conflict = None
     if form.validate_on_submit():
-        student.student_fname = form.student_fname.data
-        student.student_lname = form.student_fname.data
-        student.student_number = form.student_number.data
-        student.contact_mobile = form.contact_mobile.data
-        student.contact_email = form.contact_email.data
-        db.session.add(student)
-        db.session.commit()
-        flash('You have successfully edited the student.')
+        # a blank number keeps the one already allocated
+        if form.student_number.data is None:
+            form.student_number.data = student.student_number
+        if form.student_number.data != student.student_number and \
+                student_number_in_use(form.student_number.data):
+            form.student_number.errors = list(form.student_number.errors) + [
+                'This value is already in use.']
+            conflict = []
+        else:
+            conflict = save_edit(student, form, (
+                'student_fname', 'student_lname', 'student_number',
+                'contact_mobile', 'contact_email'))
+        if conflict is None:
+            flash('You have successfully edited the student.')
+
+            # redirect to the students page
+            return redirect(url_for('admin.list_students'))
 
-        # redirect to the students page
-        return redirect(url_for('admin.list_students'))
-
-    form.contact_email.data = student.contact_email
-    form.contact_mobile.data = student.contact_mobile
-    form.student_number.data = student.student_number
-    form.student_fname.data = student.student_lname
-    form.student_fname.data = student.student_fname
     return render_template('admin/students/student.html', add_student=add_student,
-                           form=form, title="Edit Student")
+                           form=form, conflict=conflict, title="Edit Student")
 
 @admin.route('/students/delete/<int:id>', methods=['GET', 'POST'])
 @login_required
@@ -328,8 +433,8 @@ def delete_student(id):
     """
     check_admin()
 
-    student = Student.query.get_or_404(id)
-    db.session.delete(student)
+    student = Student.live().filter_by(id=id).first_or_404()
+    changes.soft_delete(student)
     db.session.commit()
     flash('You have successfully deleted the student.')
 
@@ -349,9 +454,10 @@ def list_courses():
     """
     check_admin()
 
-    courses = Course.query.all()
-    return render_template('admin/courses/courses.html',
-                           courses=courses, title='Courses')
+    courses = project(Course, COURSE_LIST).order_by(Course.id)
+    return stream_template('admin/courses/courses.html',
+                           courses=ChunkedRows(courses),
+                           refdata=refdata.current(), title='Courses')
 
 @admin.route('/courses/assign/<int:id>', methods=['GET', 'POST'])
 @login_required
@@ -369,8 +475,8 @@ def assign_course(id):
 
     form = CourseForm(obj=course)
     if form.validate_on_submit():
-        course.department = form.department.data
-        course.role = form.role.data
+        course.department_id = form.department_id.data
+        course.role_id = form.role_id.data
         course.student = form.student.data
         course.enrolment = form.enrolment.data
         db.session.add(course)
@@ -382,4 +488,89 @@ def assign_course(id):
 
     return render_template('admin/courses/course.html',
                            course=course, form=form,
-                           title='Assign Course')
\ No newline at end of file
+                           title='Assign Course')
+
+
+# Change Feed Views
+
+@admin.route('/changes')
+@login_required
+def list_changes():
+    """
+    Return the student, employee, course and enrolment rows changed after
+    the since cursor as JSON, one bounded page at a time
+    """
+    check_admin()
+
+    since = request.args.get('since', '0')
+    limit = request.args.get('limit', changes.PAGE_SIZE, type=int)
+    limit = max(1, min(limit, changes.MAX_PAGE_SIZE))
+
+    try:
+        changes.parse_cursor(since)
+    except ValueError:
+        abort(400)
+
+    rows, cursor, more = changes.changes_since(since, limit)
+    return jsonify(changes=rows, cursor=cursor, more=more)
+
+
+# Faculty Views
+
+def faculty_counts(faculty_session):
+    """
+    Count the students and courses in one faculty database
+    """
+    students = faculty_session.query(func.count(Student.id)) \
+        .filter(Student.deleted_at.is_(None)).scalar()
+    courses = faculty_session.query(func.count(Course.id)).scalar()
+    return dict(students=students, courses=courses)
+
+@admin.route('/faculties')
+@login_required
+def list_faculties():
+    """
+    List the faculty databases and the shared one, counting their rows in
+    parallel
+    """
+    check_admin()
+
+    counts = partitions.fan_out(faculty_counts)
+    totals = dict(students=sum(c['students'] for c in counts.values()),
+                  courses=sum(c['courses'] for c in counts.values()))
+    shared = counts.pop(None)
+    return render_template('admin/faculties/faculties.html',
+                           faculties=sorted(counts.items()), shared=shared,
+                           totals=totals,
+                           current=partitions.current_faculty(),
+                           title='Faculties')
+
+@admin.route('/faculties/use/<name>')
+@login_required
+def use_faculty(name):
+    """
+    Make the admin pages read and write the given faculty's database
+    """
+    check_admin()
+
+    if name not in partitions.faculties():
+        abort(404)
+    session['faculty'] = name
+    flash('You are now working in the {} faculty.'.format(name))
+
+    # redirect to the faculties page
+    return redirect(url_for('admin.list_faculties'))
+
+@admin.route('/faculties/shared')
+@login_required
+def use_shared_database():
+    """
+    Make the admin pages use the shared database again
+    """
+    check_admin()
+
+    session.pop('faculty', None)
+    flash('You are now working in the shared database.')
+
+    # redirect to the faculties page
+    return redirect(url_for('admin.list_faculties'))
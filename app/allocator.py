@@ -0,0 +1,147 @@
+# app/allocator.py
+
+import os
+import threading
+
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from . import partitions
+from .models import (Counter, FIRST_STUDENT_NUMBER, STUDENT_NUMBER_BLOCK,
+                     Student, student_number_seq)
+
+# name of the row in the counters table holding the last reserved number,
+# used on databases without native sequences
+STUDENT_NUMBER_COUNTER = 'student_number'
+
+
+def _reserve_from_sequence(connection, blocks):
+    starts = [connection.execute(db.select([student_number_seq.next_value()]))
+              .scalar() for _ in range(blocks)]
+    return [number for start in starts
+            for number in range(start, start + STUDENT_NUMBER_BLOCK)]
+
+
+def _reserve_from_counter(connection, size):
+    counters = Counter.__table__
+    result = connection.execute(
+        counters.update()
+        .where(counters.c.name == STUDENT_NUMBER_COUNTER)
+        .values(value=counters.c.value + size))
+    if not result.rowcount:
+        # start above the numbers already in use, e.g. imported ones
+        students = Student.__table__
+        highest = connection.execute(
+            db.select([db.func.max(students.c.student_number)])).scalar()
+        connection.execute(counters.insert().values(
+            name=STUDENT_NUMBER_COUNTER,
+            value=max(FIRST_STUDENT_NUMBER - 1, highest or 0) + size))
+    end = connection.execute(
+        db.select([counters.c.value])
+        .where(counters.c.name == STUDENT_NUMBER_COUNTER)).scalar()
+    return list(range(end - size + 1, end + 1))
+
+
+def _without_taken(connection, numbers):
+    """
+    Drop the numbers already given to a student by hand
+    """
+    if not numbers:
+        return numbers
+    students = Student.__table__
+    taken = set(number for number, in connection.execute(
+        db.select([students.c.student_number])
+        .where(students.c.student_number.between(min(numbers),
+                                                 max(numbers)))))
+    return [number for number in numbers if number not in taken]
+
+
+def _reserve_once(size):
+    blocks = -(-size // STUDENT_NUMBER_BLOCK)
+    for attempt in range(2):
+        try:
+            with db.engine.begin() as connection:
+                if connection.dialect.supports_sequences:
+                    numbers = _reserve_from_sequence(connection, blocks)
+                else:
+                    numbers = _reserve_from_counter(
+                        connection, blocks * STUDENT_NUMBER_BLOCK)
+                return _without_taken(connection, numbers)
+        except IntegrityError:
+            # another worker created the counter row first
+            if attempt:
+                raise
+
+
+def reserve(size):
+    """
+    Reserve at least size unused student numbers in short transactions of
+    their own, so the counter is never locked for longer than one UPDATE
+
+    Numbers that are reserved but never used are simply skipped, as are
+    numbers a student was given by hand. A number typed in after it was
+    reserved can still collide, so callers retry on IntegrityError.
+    """
+    numbers = []
+    while len(numbers) < size:
+        reserved = _reserve_once(size - len(numbers))
+        # students of partitioned faculties live in their own databases
+        for faculty in partitions.faculties():
+            with partitions.engine_for(faculty).connect() as connection:
+                reserved = _without_taken(connection, reserved)
+        numbers.extend(reserved)
+    return numbers
+
+
+def student_number_in_use(number):
+    """
+    Whether a student in the shared database or any faculty database has
+    number, which each database's unique index cannot tell on its own
+    """
+    for faculty in partitions.sources():
+        with partitions.engine_for(faculty).connect() as connection:
+            if not _without_taken(connection, [number]):
+                return True
+    return False
+
+
+class BlockAllocator(object):
+    """
+    Hand out numbers from a block reserved for this process, reserving
+    the next block when it runs out
+    """
+
+    def __init__(self, reserve):
+        self._reserve = reserve
+        self._lock = threading.Lock()
+        self._numbers = []
+        self._pid = None
+
+    def next(self):
+        with self._lock:
+            # a forked worker must not reuse its parent's block
+            if self._pid != os.getpid():
+                self._numbers = []
+                self._pid = os.getpid()
+            if not self._numbers:
+                self._numbers = self._reserve(STUDENT_NUMBER_BLOCK)
+                self._numbers.reverse()
+            return self._numbers.pop()
+
+
+_student_numbers = BlockAllocator(reserve)
+
+
+def allocate_student_number():
+    """
+    Return an unused student number without touching the shared counter
+    except once per block
+    """
+    return _student_numbers.next()
+
+
+def allocate_student_numbers(count):
+    """
+    Return count unused student numbers for a bulk import
+    """
+    return reserve(count)[:count]
@@ -0,0 +1,369 @@
+# app/assets.py
+
+import gzip
+import hashlib
+import io
+import json
+import mimetypes
+import os
+import posixpath
+import re
+
+import click
+from flask import send_from_directory
+
+from .compress import choose_encoding
+
+try:
+    from urllib.request import urlopen
+except ImportError:
+    from urllib2 import urlopen
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# fingerprinted files and the manifest live under this static subdirectory
+BUILD_DIR = 'build'
+MANIFEST = 'manifest.json'
+
+CDN = 'https://maxcdn.bootstrapcdn.com/'
+
+# third-party files committed under static/vendor, keeping the CDN layout
+# so their relative font references still resolve; "flask assets vendor
+# --force" downloads them again
+VENDOR_FILES = (
+    'bootstrap/3.3.7/css/bootstrap.min.css',
+    'bootstrap/3.3.7/fonts/glyphicons-halflings-regular.eot',
+    'bootstrap/3.3.7/fonts/glyphicons-halflings-regular.svg',
+    'bootstrap/3.3.7/fonts/glyphicons-halflings-regular.ttf',
+    'bootstrap/3.3.7/fonts/glyphicons-halflings-regular.woff',
+    'bootstrap/3.3.7/fonts/glyphicons-halflings-regular.woff2',
+    'font-awesome/4.7.0/css/font-awesome.min.css',
+    'font-awesome/4.7.0/fonts/FontAwesome.otf',
+    'font-awesome/4.7.0/fonts/fontawesome-webfont.eot',
+    'font-awesome/4.7.0/fonts/fontawesome-webfont.svg',
+    'font-awesome/4.7.0/fonts/fontawesome-webfont.ttf',
+    'font-awesome/4.7.0/fonts/fontawesome-webfont.woff',
+    'font-awesome/4.7.0/fonts/fontawesome-webfont.woff2',
+)
+
+# background images given resized and WebP variants, with the CSS
+# selector that displays them
+RESPONSIVE_IMAGES = {
+    'img/intro-bg.jpg': '.intro-header',
+}
+RESPONSIVE_WIDTHS = (640, 1280, 1920)
+
+PRECOMPRESS = ('.css', '.js', '.svg', '.ico', '.json', '.xml', '.html',
+               '.webmanifest', '.ttf', '.eot', '.otf')
+
+IGNORED = ('.DS_Store',)
+
+CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+# fingerprinted names never change content, so clients may keep them forever
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def write_atomic(path, data, mode='wb'):
+    """
+    Write data to a temporary name and rename it over path, so a reader
+    never sees a partial file
+    """
+    partial = '{}.{}.partial'.format(path, os.getpid())
+    with open(partial, mode) as output:
+        output.write(data)
+    os.rename(partial, path)
+
+
+def missing_vendor(static_folder):
+    """
+    Return the VENDOR_FILES not present in static/vendor
+    """
+    return [path for path in VENDOR_FILES if not os.path.exists(
+        os.path.join(static_folder, 'vendor', *path.split('/')))]
+
+
+def fingerprint(path, data):
+    """
+    Insert a short content hash before the extension of path
+    """
+    stem, ext = posixpath.splitext(path)
+    return '{}.{}{}'.format(stem, hashlib.sha256(data).hexdigest()[:10], ext)
+
+
+class Builder(object):
+    """
+    Write fingerprinted copies of the static files into static/build
+
+    Files from earlier builds are left in place: running workers and cached
+    pages still refer to them, and a fingerprinted name always holds the
+    same content.
+    """
+
+    def __init__(self, static_folder):
+        self.static_folder = static_folder
+        self.build_folder = os.path.join(static_folder, BUILD_DIR)
+        self.assets = {}
+        self.encodings = {}
+
+    def sources(self):
+        for root, dirs, files in os.walk(self.static_folder):
+            if root == self.static_folder and BUILD_DIR in dirs:
+                dirs.remove(BUILD_DIR)
+            for name in sorted(files):
+                if name in IGNORED:
+                    continue
+                path = os.path.join(root, name)
+                yield os.path.relpath(path, self.static_folder).replace(
+                    os.sep, '/')
+
+    def read(self, path):
+        with open(os.path.join(self.static_folder, path), 'rb') as source:
+            return source.read()
+
+    def emit(self, path, data):
+        """
+        Write data under its fingerprinted name with precompressed
+        variants, and record it in the manifest
+        """
+        built = posixpath.join(BUILD_DIR, fingerprint(path, data))
+        target = os.path.join(self.static_folder, *built.split('/'))
+        if not os.path.isdir(os.path.dirname(target)):
+            os.makedirs(os.path.dirname(target))
+        if not os.path.exists(target):
+            write_atomic(target, data)
+
+        encodings = []
+        if posixpath.splitext(path)[1] in PRECOMPRESS:
+            for encoding, suffix, compressed in self.compressed(data):
+                if len(compressed) < len(data):
+                    if not os.path.exists(target + suffix):
+                        write_atomic(target + suffix, compressed)
+                    encodings.append(encoding)
+
+        self.assets[path] = built
+        if encodings:
+            self.encodings[built] = encodings
+        return built
+
+    def compressed(self, data):
+        if brotli is not None:
+            yield 'br', '.br', brotli.compress(data, quality=11)
+        buffer = io.BytesIO()
+        # a fixed mtime keeps the output reproducible
+        with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=9,
+                           mtime=0) as gz:
+            gz.write(data)
+        yield 'gzip', '.gz', buffer.getvalue()
+
+    def image_variants(self, path):
+        """
+        Emit resized JPEG and WebP versions of a responsive image, returning
+        [(max width or None, jpeg, webp)] from largest to smallest
+        """
+        if Image is None:
+            return []
+
+        image = Image.open(os.path.join(self.static_folder, path))
+        image.load()
+        stem = posixpath.splitext(path)[0]
+        sizes = [(None, image.size[0])]
+        sizes.extend((width, width) for width in sorted(RESPONSIVE_WIDTHS,
+                                                        reverse=True)
+                     if width < image.size[0])
+
+        variants = []
+        for max_width, width in sizes:
+            height = int(round(image.size[1] * float(width) / image.size[0]))
+            resized = image if max_width is None else image.resize(
+                (width, height), Image.LANCZOS)
+            names = []
+            for ext, fmt in (('.jpg', 'JPEG'), ('.webp', 'WEBP')):
+                buffer = io.BytesIO()
+                resized.convert('RGB').save(buffer, fmt, quality=80)
+                suffix = '' if max_width is None else '-{}'.format(width)
+                names.append(self.emit(stem + suffix + ext,
+                                       buffer.getvalue()))
+            variants.append((max_width, names[0], names[1]))
+        return variants
+
+    def responsive_rules(self, css_path, image, variants):
+        """
+        CSS rules switching the background of RESPONSIVE_IMAGES[image] to
+        the best variant for the viewport and browser
+        """
+        selector = RESPONSIVE_IMAGES[image]
+        rules = []
+        for max_width, jpeg, webp in variants:
+            jpeg = self.relative(css_path, jpeg)
+            webp = self.relative(css_path, webp)
+            rule = ('{} {{ background-image: url({}); background-image: '
+                    'image-set(url({}) type("image/webp"), '
+                    'url({}) type("image/jpeg")); }}').format(
+                        selector, jpeg, webp, jpeg)
+            if max_width is not None:
+                rule = '@media (max-width: {}px) {{ {} }}'.format(max_width,
+                                                                  rule)
+            rules.append(rule)
+        return '\n'.join(rules)
+
+    def relative(self, css_path, built):
+        """
+        Path of a built file relative to the built copy of css_path
+        """
+        css_dir = posixpath.dirname(posixpath.join(BUILD_DIR, css_path))
+        return posixpath.relpath(built, css_dir)
+
+    def rewrite_css(self, path, variants):
+        """
+        Point url() references in a stylesheet at fingerprinted files
+        """
+        css = self.read(path).decode('utf-8')
+        used = []
+
+        def replace(match):
+            url = match.group(2)
+            if ':' in url or url.startswith(('/', '#')):
+                return match.group(0)
+            target, suffix = re.match(r'([^?#]*)(.*)', url).groups()
+            target = posixpath.normpath(
+                posixpath.join(posixpath.dirname(path), target))
+            if target not in self.assets:
+                return match.group(0)
+            if target in variants and target not in used:
+                used.append(target)
+            return 'url({}{})'.format(
+                self.relative(path, self.assets[target]), suffix)
+
+        css = CSS_URL.sub(replace, css)
+        for image in used:
+            css += '\n' + self.responsive_rules(path, image, variants[image])
+        return css.encode('utf-8')
+
+    def build(self):
+        """
+        Build every static file, then switch to the new manifest in one
+        rename. Raises RuntimeError if vendored files are missing.
+        """
+        missing = missing_vendor(self.static_folder)
+        if missing:
+            raise RuntimeError('Missing vendored files: {}'.format(
+                ', '.join(missing)))
+
+        paths = list(self.sources())
+        stylesheets = [path for path in paths if path.endswith('.css')]
+        variants = {}
+
+        # stylesheets go last so their url() targets already have names
+        for path in paths:
+            if path in stylesheets:
+                continue
+            self.emit(path, self.read(path))
+            if path in RESPONSIVE_IMAGES:
+                variants[path] = self.image_variants(path)
+        for path in stylesheets:
+            self.emit(path, self.rewrite_css(path, variants))
+
+        manifest = json.dumps(dict(assets=self.assets,
+                                   encodings=self.encodings),
+                              indent=2, sort_keys=True)
+        write_atomic(os.path.join(self.build_folder, MANIFEST), manifest, 'w')
+        return len(self.assets)
+
+
+def fetch_vendor(static_folder, force=False):
+    """
+    Download VENDOR_FILES from the CDN into static/vendor
+    """
+    fetched = 0
+    for path in VENDOR_FILES:
+        target = os.path.join(static_folder, 'vendor', *path.split('/'))
+        if os.path.exists(target) and not force:
+            continue
+        if not os.path.isdir(os.path.dirname(target)):
+            os.makedirs(os.path.dirname(target))
+        write_atomic(target, urlopen(CDN + path).read())
+        fetched += 1
+    return fetched
+
+
+def load_manifest(static_folder):
+    path = os.path.join(static_folder, BUILD_DIR, MANIFEST)
+    if not os.path.exists(path):
+        return dict(assets={}, encodings={})
+    with open(path) as manifest:
+        return json.load(manifest)
+
+
+def init_app(app):
+    """
+    Serve fingerprinted assets when a build exists, and register the
+    assets commands on the flask CLI
+    """
+    manifest = load_manifest(app.static_folder)
+    assets = manifest['assets']
+    encodings = manifest['encodings']
+
+    @app.url_defaults
+    def fingerprinted_url(endpoint, values):
+        if endpoint == 'static' and values.get('filename') in assets:
+            values['filename'] = assets[values['filename']]
+
+    static_view = app.view_functions['static']
+
+    def send_static(filename):
+        if not filename.startswith(BUILD_DIR + '/'):
+            return static_view(filename=filename)
+
+        mimetype = mimetypes.guess_type(filename)[0]
+        encoding = None
+        if filename in encodings:
+            encoding = choose_encoding(encodings[filename])
+        suffix = {'br': '.br', 'gzip': '.gz'}.get(encoding, '')
+
+        response = send_from_directory(app.static_folder, filename + suffix,
+                                       mimetype=mimetype)
+        if encoding is not None:
+            response.headers['Content-Encoding'] = encoding
+        if filename in encodings:
+            response.vary.add('Accept-Encoding')
+        response.headers['Cache-Control'] = IMMUTABLE
+        return response
+
+    app.view_functions['static'] = send_static
+
+    @app.cli.group('assets')
+    def assets_cli():
+        """
+        Build and vendor static assets
+        """
+
+    @assets_cli.command('vendor')
+    @click.option('--force', is_flag=True, help='Download existing files again.')
+    def vendor(force):
+        """
+        Download missing Bootstrap and Font Awesome files into static/vendor
+        """
+        fetched = fetch_vendor(app.static_folder, force)
+        click.echo('Fetched {} vendor files'.format(fetched))
+
+    @assets_cli.command('build')
+    def build():
+        """
+        Fingerprint and precompress static files into static/build
+        """
+        try:
+            built = Builder(app.static_folder).build()
+        except RuntimeError as error:
+            raise click.ClickException(
+                '{}; run "flask assets vendor" first'.format(error))
+        click.echo('Built {} assets; restart the app to serve them'.format(
+            built))
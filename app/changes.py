@@ -0,0 +1,256 @@
+# app/changes.py
+
+from collections import defaultdict
+from datetime import datetime
+from operator import itemgetter
+
+from sqlalchemy import bindparam, event
+from sqlalchemy.orm import Session
+
+from app import db
+from . import partitions
+from .models import Counter, Course, Employee, Enrolment, Student
+
+# name of the row in the counters table that numbers committed changes
+CHANGE_COUNTER = 'changes'
+
+# (feed name, model, columns left out of the feed) for every tracked table
+FEEDS = (
+    ('students', Student, ()),
+    ('employees', Employee, ('password_hash',)),
+    ('courses', Course, ()),
+    ('enrolments', Enrolment, ()),
+)
+
+TRACKED = tuple(model for _, model, _ in FEEDS)
+
+PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+
+
+def _referencing(tables, model):
+    """
+    Yield (table, column) for every column of tables with a foreign key to
+    model's table
+    """
+    for table in tables:
+        for column in table.columns:
+            if any(key.references(model.__table__)
+                   for key in column.foreign_keys):
+                yield table, column
+
+
+def touch_referencing(session, model, id):
+    """
+    Mark rows that reference model's row id as changed, in the shared
+    database and every faculty database
+
+    Used before a bulk delete, whose ON DELETE SET NULL rules change those
+    rows without going through the ORM. Faculty databases have no foreign
+    keys to shared tables, so there the reference is set to NULL here.
+    """
+    now = datetime.utcnow()
+    partitioned = [db.metadata.tables[name]
+                   for name in partitions.PARTITIONED_TABLES]
+    for faculty in partitions.sources():
+        if faculty is None:
+            tables = [tracked.__table__ for _, tracked, _ in FEEDS]
+        else:
+            tables = partitioned
+        for table, column in _referencing(tables, model):
+            values = {}
+            if faculty is not None:
+                values[column.name] = None
+            if 'change_seq' in table.c:
+                values.update(change_seq=None, updated_at=now)
+            session.execute(table.update().where(column == id).values(values),
+                            bind=partitions.engine_for(faculty))
+
+
+@event.listens_for(Session, 'before_flush')
+def stamp_changes(session, flush_context, instances):
+    """
+    Stamp new and modified tracked rows with the time and mark them as
+    waiting for a sequence number
+
+    Writers never touch the counters table, so they do not queue behind
+    each other on its row. Deleting a tracked row through the session
+    soft-deletes it instead, so the feed can still report the deletion.
+    """
+    now = datetime.utcnow()
+    for obj in list(session.deleted):
+        if isinstance(obj, TRACKED):
+            # expunging cancels the pending DELETE; re-adding keeps the
+            # row's identity so the change below flushes as an UPDATE
+            session.expunge(obj)
+            session.add(obj)
+            if obj.deleted_at is None:
+                obj.deleted_at = now
+    for obj in session.new:
+        if isinstance(obj, TRACKED):
+            obj.updated_at = now
+            obj.change_seq = None
+    for obj in session.dirty:
+        if isinstance(obj, TRACKED) and session.is_modified(obj):
+            obj.updated_at = now
+            obj.change_seq = None
+
+
+def _reserve(connection, size):
+    """
+    Reserve size change sequence numbers, returning the first
+    """
+    counters = Counter.__table__
+    result = connection.execute(
+        counters.update()
+        .where(counters.c.name == CHANGE_COUNTER)
+        .values(value=counters.c.value + size))
+    if not result.rowcount:
+        connection.execute(counters.insert().values(name=CHANGE_COUNTER,
+                                                    value=size))
+    end = connection.execute(
+        db.select([counters.c.value])
+        .where(counters.c.name == CHANGE_COUNTER)).scalar()
+    return end - size + 1
+
+
+def sequence_pending(engine, limit, feeds=FEEDS):
+    """
+    Number up to limit committed rows that are waiting for a sequence
+    number, in a short transaction of its own. Returns True if rows may
+    still be waiting.
+
+    Only readers of the feed take the counter lock, and a number is only
+    ever given to a row whose change has already committed, so numbers
+    become visible in increasing order and a reader never skips a change.
+    A row changed again before it is numbered is numbered once; a row
+    numbered by a concurrent call keeps that number, leaving a gap.
+    """
+    with engine.begin() as connection:
+        pending = []
+        for _, model, _ in feeds:
+            table = model.__table__
+            ids = connection.execute(
+                db.select([table.c.id])
+                .where(table.c.change_seq.is_(None))
+                .order_by(table.c.id).limit(limit - len(pending))).fetchall()
+            pending.extend((table, id) for id, in ids)
+            if len(pending) >= limit:
+                break
+        if not pending:
+            return False
+
+        numbers = defaultdict(list)
+        seq = _reserve(connection, len(pending))
+        for table, id in pending:
+            numbers[table].append(dict(row_id=id, seq=seq))
+            seq += 1
+        for table, params in numbers.items():
+            connection.execute(
+                table.update()
+                .where(table.c.id == bindparam('row_id'))
+                .where(table.c.change_seq.is_(None))
+                .values(change_seq=bindparam('seq')), params)
+    return len(pending) >= limit
+
+
+def soft_delete(obj):
+    """
+    Mark a tracked row as deleted so the feed can report it
+    """
+    obj.deleted_at = datetime.utcnow()
+
+
+def _serialize(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _feeds(faculty):
+    """
+    The feeds whose tables are stored in a faculty's database, or every
+    feed for the shared database
+    """
+    if faculty is None:
+        return FEEDS
+    return tuple(feed for feed in FEEDS if partitions.is_partitioned(feed[1]))
+
+
+def parse_cursor(cursor):
+    """
+    Parse a cursor into {faculty slug: seq}, with '' for the shared
+    database
+
+    A cursor holds one position per database, e.g. "12,science:40"; a
+    plain number is a position in the shared database. Raises ValueError
+    for a malformed cursor.
+    """
+    positions = {}
+    for item in str(cursor).split(','):
+        source, _, seq = item.rpartition(':')
+        positions[source] = int(seq)
+    return positions
+
+
+def format_cursor(positions):
+    return ','.join(str(seq) if not source else '{}:{}'.format(source, seq)
+                    for source, seq in sorted(positions.items()))
+
+
+def _fetch(feeds, since, limit):
+    """
+    Fetch up to limit (seq, feed name, row) tuples after since
+    """
+    rows = []
+    for name, model, excluded in feeds:
+        columns = [column for column in model.__table__.columns
+                   if column.name not in excluded]
+        rows.extend((row.change_seq, name, row) for row in
+                    db.session.query(*columns)
+                    .filter(model.change_seq > since)
+                    .order_by(model.change_seq).limit(limit))
+    rows.sort(key=itemgetter(0))
+    return rows[:limit]
+
+
+def changes_since(since=0, limit=PAGE_SIZE):
+    """
+    Return a page of at most limit changes after the cursor since
+
+    Each database numbers its own rows, so the cursor keeps a position per
+    faculty and every change names the faculty it came from (None for the
+    shared database). Databases are read in turn, the shared one first.
+    Every row carries a sequence number of its own, so a page can end
+    anywhere. Returns (changes, cursor, more).
+    """
+    positions = parse_cursor(since)
+    changes = []
+    more = False
+    for faculty in partitions.sources():
+        remaining = limit - len(changes)
+        if remaining <= 0:
+            more = True
+            break
+
+        source = partitions.slug(faculty) if faculty else ''
+        feeds = _feeds(faculty)
+        if sequence_pending(partitions.engine_for(faculty), remaining,
+                            feeds):
+            more = True
+        with partitions.use_faculty(faculty):
+            rows = _fetch(feeds, positions.get(source, 0), remaining + 1)
+        if len(rows) > remaining:
+            more = True
+            rows = rows[:remaining]
+
+        for seq, name, row in rows:
+            data = dict((key, _serialize(value))
+                        for key, value in zip(row.keys(), row))
+            changes.append(dict(table=name, faculty=faculty, seq=seq,
+                                row=data,
+                                op='delete' if row.deleted_at else 'upsert'))
+        if rows:
+            positions[source] = rows[-1][0]
+
+    return changes, format_cursor(positions), more
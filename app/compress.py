@@ -0,0 +1,110 @@
+# app/compress.py
+
+import gzip
+import io
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = ('text/html', 'text/css', 'text/plain', 'text/javascript',
+                'application/javascript', 'application/json',
+                'image/svg+xml')
+
+
+def init_app(app):
+    """
+    Compress dynamic responses with brotli or gzip
+    """
+    app.config.setdefault('COMPRESS_MIN_SIZE', 500)
+    app.config.setdefault('COMPRESS_LEVEL', 6)
+    app.config.setdefault('COMPRESS_BR_LEVEL', 4)
+
+    @app.after_request
+    def compress_response(response):
+        return _compress_response(app, response)
+
+
+def choose_encoding(available=None):
+    """
+    Pick the best encoding the client accepts, or None
+
+    available limits the choice, e.g. to the precompressed variants of a
+    static file. It defaults to the encodings this process can produce.
+    """
+    if available is None:
+        available = ('br', 'gzip') if brotli is not None else ('gzip',)
+    accepted = request.accept_encodings
+    for encoding in ('br', 'gzip'):
+        if encoding in available and accepted[encoding]:
+            return encoding
+    return None
+
+
+def _compress_response(app, response):
+    if (response.status_code < 200 or response.status_code in (204, 304) or
+            response.direct_passthrough or
+            'Content-Encoding' in response.headers or
+            response.mimetype not in COMPRESSIBLE):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        # size is unknown up front, so streamed pages are always compressed
+        response.response = _compress_stream(app, response.response,
+                                             encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < app.config['COMPRESS_MIN_SIZE']:
+            return response
+        response.set_data(_compress(app, data, encoding))
+
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def _compress(app, data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=app.config['COMPRESS_BR_LEVEL'])
+
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb',
+                       compresslevel=app.config['COMPRESS_LEVEL']) as gz:
+        gz.write(data)
+    return buffer.getvalue()
+
+
+def _compress_stream(app, chunks, encoding):
+    """
+    Compress a streamed body, flushing after every chunk so the client
+    receives each part of the page as soon as it is rendered
+    """
+    if encoding == 'br':
+        compressor = brotli.Compressor(
+            quality=app.config['COMPRESS_BR_LEVEL'])
+        compress, flush, finish = (compressor.process, compressor.flush,
+                                   compressor.finish)
+    else:
+        # wbits of 16 + MAX_WBITS writes a gzip header and trailer
+        compressor = zlib.compressobj(app.config['COMPRESS_LEVEL'],
+                                      zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        compress = compressor.compress
+        flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+        finish = compressor.flush
+
+    for chunk in chunks:
+        if not isinstance(chunk, bytes):
+            chunk = chunk.encode('utf-8')
+        data = compress(chunk) + flush()
+        if data:
+            yield data
+    yield finish()
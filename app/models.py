@@ -1,11 +1,29 @@
 # app/models.py
 
+from datetime import datetime
+
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from app import db, login_manager
 from sqlalchemy import Column, Integer, DateTime
 
-class Employee(UserMixin, db.Model):
+class ChangeTrackedMixin(object):
+    """
+    Columns for the downstream change feed, maintained by app.changes
+    """
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    deleted_at = db.Column(db.DateTime)
+    change_seq = db.Column(db.Integer, index=True)
+
+    @classmethod
+    def live(cls):
+        """
+        Query the rows that have not been soft-deleted
+        """
+        return cls.query.filter(cls.deleted_at.is_(None))
+
+class Employee(UserMixin, ChangeTrackedMixin, db.Model):
     """
     Create an Employee table
     """
@@ -15,14 +33,16 @@ class Employee(UserMixin, db.Model):
     __tablename__ = 'employees'
 
     id = db.Column(db.Integer, primary_key=True)
+    version_id = db.Column(db.Integer, nullable=False, server_default='1')
+    __mapper_args__ = {'version_id_col': version_id}
     email = db.Column(db.String(60), index=True, unique=True)
     username = db.Column(db.String(60), index=True, unique=True)
     first_name = db.Column(db.String(60), index=True)
     last_name = db.Column(db.String(60), index=True)
     password_hash = db.Column(db.String(128))
-    department_id = db.Column(db.Integer, db.ForeignKey('departments.id'))
-    role_id = db.Column(db.Integer, db.ForeignKey('roles.id'))
-    lecturer_id =  db.Column(db.Integer, db.ForeignKey('lecturers.id'))
+    department_id = db.Column(db.Integer, db.ForeignKey('departments.id', ondelete='SET NULL'))
+    role_id = db.Column(db.Integer, db.ForeignKey('roles.id', ondelete='SET NULL'))
+    lecturer_id =  db.Column(db.Integer, db.ForeignKey('lecturers.id', ondelete='SET NULL'))
     is_admin = db.Column(db.Boolean, default=False)
 
     @property
@@ -61,12 +81,14 @@ class Department(db.Model):
     __tablename__ = 'departments'
 
     id = db.Column(db.Integer, primary_key=True)
+    version_id = db.Column(db.Integer, nullable=False, server_default='1')
+    __mapper_args__ = {'version_id_col': version_id}
     name = db.Column(db.String(60), unique=True)
     description = db.Column(db.String(150))
     faculty_name = db.Column(db.String(60), index=True)
-    offer_id = db.Column(db.Integer, db.ForeignKey('offers.id'))
+    offer_id = db.Column(db.Integer, db.ForeignKey('offers.id', ondelete='SET NULL'))
     employees = db.relationship('Employee', backref='department',
-                                lazy='dynamic')
+                                lazy='dynamic', passive_deletes=True)
 
     def __repr__(self):
         return '<Department: {}>'.format(self.name)
@@ -79,15 +101,17 @@ class Role(db.Model):
     __tablename__ = 'roles'
 
     id = db.Column(db.Integer, primary_key=True)
+    version_id = db.Column(db.Integer, nullable=False, server_default='1')
+    __mapper_args__ = {'version_id_col': version_id}
     name = db.Column(db.String(60), unique=True)
     description = db.Column(db.String(200), index=True)
     employees = db.relationship('Employee', backref='role',
-                                lazy='dynamic')
+                                lazy='dynamic', passive_deletes=True)
 
     def __repr__(self):
         return '<Role: {}>'.format(self.name)
 
-class Course(db.Model):
+class Course(ChangeTrackedMixin, db.Model):
     """
     Create a Course table
     """
@@ -97,17 +121,17 @@ class Course(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     course_name = db.Column(db.String(60), unique=True)
     description = db.Column(db.String(150))
-    offer_id = db.Column(db.Integer, db.ForeignKey('offers.id'))
-    include_id = db.Column(db.Integer, db.ForeignKey('includes.id'))
-    enrolment_id = db.Column(db.Integer, db.ForeignKey('enrolments.id'))
-    department_id = db.Column(db.Integer, db.ForeignKey('departments.id'))
-    role_id = db.Column(db.Integer, db.ForeignKey('roles.id'))
+    offer_id = db.Column(db.Integer, db.ForeignKey('offers.id', ondelete='SET NULL'))
+    include_id = db.Column(db.Integer, db.ForeignKey('includes.id', ondelete='SET NULL'))
+    enrolment_id = db.Column(db.Integer, db.ForeignKey('enrolments.id', ondelete='SET NULL'))
+    department_id = db.Column(db.Integer, db.ForeignKey('departments.id', ondelete='SET NULL'))
+    role_id = db.Column(db.Integer, db.ForeignKey('roles.id', ondelete='SET NULL'))
 
 
     def __repr__(self):
         return '<Course: {}>'.format(self.course_name)
 
-class Enrolment(db.Model):
+class Enrolment(ChangeTrackedMixin, db.Model):
     """
     Create a Enrolment table
     """
@@ -117,9 +141,9 @@ class Enrolment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     year_enrol = db.Column(db.String(60))
     students = db.relationship('Student', backref='enrolment',
-                                lazy='dynamic')
+                                lazy='dynamic', passive_deletes=True)
     courses = db.relationship('Course', backref='enrolment',
-                                lazy='dynamic')
+                                lazy='dynamic', passive_deletes=True)
 
     def __repr__(self):
         return '<Enrolment: {}>'.format(self.year_enrol)
@@ -134,14 +158,23 @@ class Include(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     term_enrol = db.Column(db.String(60), index=True)
     modules = db.relationship('Module', backref='include',
-                                lazy='dynamic')
+                                lazy='dynamic', passive_deletes=True)
     courses = db.relationship('Course', backref='include',
-                                lazy='dynamic')
+                                lazy='dynamic', passive_deletes=True)
 
     def __repr__(self):
         return '<Include: {}>'.format(self.term_enrol)
 
-class Student(db.Model):
+# native sequence for student numbers on databases that support them; each
+# nextval reserves a whole block, see app.allocator
+FIRST_STUDENT_NUMBER = 100000
+STUDENT_NUMBER_BLOCK = 100
+student_number_seq = db.Sequence('student_number_seq',
+                                 start=FIRST_STUDENT_NUMBER,
+                                 increment=STUDENT_NUMBER_BLOCK,
+                                 metadata=db.metadata)
+
+class Student(ChangeTrackedMixin, db.Model):
     """
     Create a Student table
     """
@@ -149,14 +182,16 @@ class Student(db.Model):
     __tablename__ = 'students'
 
     id = db.Column(db.Integer, primary_key=True)
+    version_id = db.Column(db.Integer, nullable=False, server_default='1')
+    __mapper_args__ = {'version_id_col': version_id}
     student_fname = db.Column(db.String(60))
     student_lname = db.Column(db.String(60))
-    student_number = db.Column(db.Integer)
+    student_number = db.Column(db.Integer, unique=True)
     contact_mobile = db.Column(db.String(60))
     contact_email = db.Column(db.String(60))
-    enrolment_id = db.Column(db.Integer, db.ForeignKey('enrolments.id'))
-    take_id = db.Column(db.Integer, db.ForeignKey('takes.id'))
-    tutor_id = db.Column(db.Integer, db.ForeignKey('tutors.id'))
+    enrolment_id = db.Column(db.Integer, db.ForeignKey('enrolments.id', ondelete='SET NULL'))
+    take_id = db.Column(db.Integer, db.ForeignKey('takes.id', ondelete='SET NULL'))
+    tutor_id = db.Column(db.Integer, db.ForeignKey('tutors.id', ondelete='SET NULL'))
 
     def __repr__(self):
         return '<Student: {}>'.format(self.student_fname)
@@ -172,13 +207,51 @@ class Module(db.Model):
     module_name = db.Column(db.String(60))
     description = db.Column(db.String(150))
     Year_completed = db.Column(db.Integer)
-    take_id = db.Column(db.Integer, db.ForeignKey('takes.id'))
-    teach_id = db.Column(db.Integer, db.ForeignKey('teaches.id'))
-    include_id = db.Column(db.Integer, db.ForeignKey('includes.id'))
+    take_id = db.Column(db.Integer, db.ForeignKey('takes.id', ondelete='SET NULL'))
+    teach_id = db.Column(db.Integer, db.ForeignKey('teaches.id', ondelete='SET NULL'))
+    include_id = db.Column(db.Integer, db.ForeignKey('includes.id', ondelete='SET NULL'))
 
     def __repr__(self):
         return '<Module: {}>'.format(self.module_name)
 
+class ModulePrerequisite(db.Model):
+    """
+    Create a ModulePrerequisite table, one row per direct prerequisite edge
+    """
+
+    __tablename__ = 'module_prerequisites'
+
+    module_id = db.Column(db.Integer, db.ForeignKey('modules.id'),
+                          primary_key=True)
+    prerequisite_id = db.Column(db.Integer, db.ForeignKey('modules.id'),
+                                primary_key=True)
+
+    def __repr__(self):
+        return '<ModulePrerequisite: {} requires {}>'.format(
+            self.module_id, self.prerequisite_id)
+
+class ModuleClosure(db.Model):
+    """
+    Create a ModuleClosure table holding every module/prerequisite pair
+    reachable through prerequisite edges, with the number of distinct paths
+    """
+
+    __tablename__ = 'module_closure'
+    __table_args__ = (
+        db.Index('ix_module_closure_prerequisite_id', 'prerequisite_id',
+                 'module_id'),
+    )
+
+    module_id = db.Column(db.Integer, db.ForeignKey('modules.id'),
+                          primary_key=True)
+    prerequisite_id = db.Column(db.Integer, db.ForeignKey('modules.id'),
+                                primary_key=True)
+    paths = db.Column(db.BigInteger, nullable=False, default=1)
+
+    def __repr__(self):
+        return '<ModuleClosure: {} requires {}>'.format(
+            self.module_id, self.prerequisite_id)
+
 class Offer(db.Model):
     """
     Create a Offer table
@@ -189,9 +262,9 @@ class Offer(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     offer_year = db.Column(db.Integer)
     departments = db.relationship('Department', backref='offer',
-                                lazy='dynamic')
+                                lazy='dynamic', passive_deletes=True)
     courses = db.relationship('Course', backref='offer',
-                                lazy='dynamic')
+                                lazy='dynamic', passive_deletes=True)
 
     def __repr__(self):
         return '<Offer: {}>'.format(self.offer_year)
@@ -207,9 +280,9 @@ class Take(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     students = db.relationship('Student', backref='take',
-                                lazy='dynamic')
+                                lazy='dynamic', passive_deletes=True)
     modules = db.relationship('Module', backref='take',
-                                lazy='dynamic')
+                                lazy='dynamic', passive_deletes=True)
 
     def __repr__(self):
         return '<Take: {}>'.format(self.id)
@@ -224,9 +297,9 @@ class Tutor(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     tut_description = db.Column(db.String(150))
     students = db.relationship('Student', backref='tutor',
-                                lazy='dynamic')
+                                lazy='dynamic', passive_deletes=True)
     lecturers = db.relationship('Lecturer', backref='tutor',
-                                lazy='dynamic')
+                                lazy='dynamic', passive_deletes=True)
 
     def __repr__(self):
         return '<Tutor: {}>'.format(self.students)
@@ -243,10 +316,10 @@ class Lecturer(db.Model):
     Year_joined = db.Column(db.Integer)
     contact_mobile = db.Column(db.Integer)
     contact_email = db.Column(db.String(60))
-    teach_id = db.Column(db.Integer, db.ForeignKey('teaches.id'))
-    tutor_id = db.Column(db.Integer, db.ForeignKey('tutors.id'))
+    teach_id = db.Column(db.Integer, db.ForeignKey('teaches.id', ondelete='SET NULL'))
+    tutor_id = db.Column(db.Integer, db.ForeignKey('tutors.id', ondelete='SET NULL'))
     employees = db.relationship('Employee', backref='lecturer',
-                                  lazy='dynamic')
+                                  lazy='dynamic', passive_deletes=True)
 
     def __repr__(self):
         return '<Lecturer: {}>'.format(self.lecturer_fname)
@@ -261,9 +334,22 @@ class Teach(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     teach_date = db.Column(db.String(60))
     modules = db.relationship('Module', backref='teach',
-                              lazy='dynamic')
+                              lazy='dynamic', passive_deletes=True)
     lecturers = db.relationship('Lecturer', backref='teach',
-                                lazy='dynamic')
+                                lazy='dynamic', passive_deletes=True)
 
     def __repr__(self):
         return '<Tutor: {}>'.format(self.teach_date)
+
+class Counter(db.Model):
+    """
+    Create a Counter table
+    """
+
+    __tablename__ = 'counters'
+
+    name = db.Column(db.String(60), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return '<Counter: {}={}>'.format(self.name, self.value)
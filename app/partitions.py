@@ -0,0 +1,219 @@
+# app/partitions.py
+
+import re
+from contextlib import contextmanager
+from multiprocessing.pool import ThreadPool
+
+import click
+from flask import (current_app, g, has_app_context, has_request_context,
+                   session)
+from flask_sqlalchemy import SignallingSession, SQLAlchemy
+from sqlalchemy import (ForeignKeyConstraint, Index, MetaData, Table,
+                        create_engine, orm)
+from sqlalchemy.sql.util import find_tables
+
+# tables stored in each faculty's own database when FACULTY_DATABASES is
+# set; everything else (employees, departments, roles, reference data and
+# counters) stays in the shared database
+PARTITIONED_TABLES = ('students', 'courses', 'takes', 'modules',
+                      'module_prerequisites', 'module_closure')
+
+# shared tables also created in each faculty database, which numbers the
+# changes to its own rows
+LOCAL_TABLES = ('counters',)
+
+
+def _touches_partition(mapper, clause):
+    if mapper is not None:
+        return mapper.local_table.name in PARTITIONED_TABLES
+    if clause is not None:
+        return any(table.name in PARTITIONED_TABLES
+                   for table in find_tables(clause, include_crud=True))
+    return False
+
+
+class RoutingSession(SignallingSession):
+    """
+    Session that sends statements on partitioned tables to the database of
+    the current faculty
+    """
+
+    def get_bind(self, mapper=None, clause=None):
+        if _touches_partition(mapper, clause):
+            faculty = current_faculty()
+            if faculty is not None:
+                return current_app.extensions['faculties'][faculty]
+        return SignallingSession.get_bind(self, mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    """
+    Flask-SQLAlchemy with faculty routing
+    """
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+def faculties():
+    """
+    Names of the configured faculty databases
+    """
+    return sorted(current_app.extensions.get('faculties', {}))
+
+
+def sources():
+    """
+    None for the shared database, followed by every faculty
+
+    The shared database holds every table, including partitioned rows
+    written before faculty databases were configured.
+    """
+    return [None] + faculties()
+
+
+def is_partitioned(model):
+    return model.__table__.name in PARTITIONED_TABLES
+
+
+def engine_for(faculty):
+    """
+    Engine of a faculty database, or of the shared database for None
+    """
+    if faculty is None:
+        return current_app.extensions['sqlalchemy'].db.engine
+    return current_app.extensions['faculties'][faculty]
+
+
+def slug(faculty):
+    """
+    Faculty name made safe for file names and cursors
+    """
+    return re.sub(r'[^A-Za-z0-9]+', '-', faculty).strip('-').lower()
+
+
+def _request_faculty():
+    """
+    Faculty of the logged-in employee's department, or the faculty an
+    admin has chosen on the faculties page
+    """
+    from flask_login import current_user
+    from . import refdata
+
+    if not current_user.is_authenticated:
+        return None
+    if current_user.is_admin:
+        return session.get('faculty')
+
+    department = refdata.current().departments.get(current_user.department_id)
+    return department.faculty_name if department else None
+
+
+def current_faculty():
+    """
+    Return the faculty whose database partitioned tables are routed to,
+    or None for the shared database
+    """
+    if not has_app_context() or not current_app.extensions.get('faculties'):
+        return None
+    if 'faculty' not in g:
+        faculty = _request_faculty() if has_request_context() else None
+        if faculty not in current_app.extensions['faculties']:
+            faculty = None
+        g.faculty = faculty
+    return g.faculty
+
+
+@contextmanager
+def use_faculty(faculty):
+    """
+    Route partitioned tables to faculty's database, e.g. in CLI commands
+    """
+    missing = object()
+    previous = g.pop('faculty', missing)
+    g.faculty = faculty
+    try:
+        yield
+    finally:
+        if previous is missing:
+            g.pop('faculty', None)
+        else:
+            g.faculty = previous
+
+
+def faculty_metadata(metadata):
+    """
+    Copy the partitioned and local tables without foreign keys to shared
+    tables, which live in another database
+    """
+    faculty = MetaData()
+    for name in PARTITIONED_TABLES + LOCAL_TABLES:
+        table = metadata.tables[name]
+        items = [column.copy() for column in table.columns]
+        for key in table.foreign_keys:
+            if key.column.table.name in PARTITIONED_TABLES:
+                items.append(ForeignKeyConstraint(
+                    [key.parent.name], [key.target_fullname],
+                    ondelete=key.ondelete))
+        for index in table.indexes:
+            # single-column indexes come back with index=True columns
+            if len(index.columns) > 1:
+                items.append(Index(index.name,
+                                   *[column.name for column in index.columns],
+                                   unique=index.unique))
+        Table(name, faculty, *items)
+    return faculty
+
+
+def fan_out(query):
+    """
+    Run query(session) against the shared database and every faculty
+    database in parallel and return {faculty: result}, with None for the
+    shared database
+
+    Each session is bound to one database, so query may only use
+    partitioned tables.
+    """
+    # the worker threads have no app context to look engines up in
+    engines = [(faculty, engine_for(faculty)) for faculty in sources()]
+
+    def run(item):
+        faculty, engine = item
+        faculty_session = orm.Session(bind=engine)
+        try:
+            return faculty, query(faculty_session)
+        finally:
+            faculty_session.close()
+
+    pool = ThreadPool(len(engines))
+    try:
+        return dict(pool.map(run, engines))
+    finally:
+        pool.close()
+        pool.join()
+
+
+def init_app(app, db):
+    """
+    Create an engine per entry of FACULTY_DATABASES ({faculty_name: URI})
+    and register the faculties commands on the flask CLI
+    """
+    app.extensions['faculties'] = dict(
+        (faculty, create_engine(uri))
+        for faculty, uri in app.config.get('FACULTY_DATABASES', {}).items())
+
+    @app.cli.group('faculties')
+    def faculties_cli():
+        """
+        Manage faculty databases
+        """
+
+    @faculties_cli.command('create')
+    def create():
+        """
+        Create the partitioned tables in every faculty database
+        """
+        metadata = faculty_metadata(db.metadata)
+        for faculty, engine in sorted(app.extensions['faculties'].items()):
+            metadata.create_all(engine)
+            click.echo('Created tables for {}'.format(faculty))
@@ -0,0 +1,190 @@
+# app/prerequisites.py
+
+from sqlalchemy import and_, bindparam, exists
+
+from app import db
+from .models import (Counter, Module, ModuleClosure, ModulePrerequisite,
+                     Student)
+
+# name of the row in the counters table locked while edges are edited
+EDGE_COUNTER = 'prerequisites'
+
+# keeps IN lists below the bound-parameter limit of SQLite
+CHUNK_SIZE = 500
+
+
+def _chunks(ids):
+    ids = list(ids)
+    for start in range(0, len(ids), CHUNK_SIZE):
+        yield ids[start:start + CHUNK_SIZE]
+
+
+def _dependents(module_id):
+    """
+    Map every module requiring module_id (and module_id itself) to the
+    number of paths leading to it
+    """
+    paths = {module_id: 1}
+    paths.update(db.session.query(ModuleClosure.module_id, ModuleClosure.paths)
+                 .filter(ModuleClosure.prerequisite_id == module_id))
+    return paths
+
+
+def _requirements(module_id):
+    """
+    Map every prerequisite of module_id (and module_id itself) to the
+    number of paths leading to it
+    """
+    paths = {module_id: 1}
+    paths.update(db.session.query(ModuleClosure.prerequisite_id,
+                                  ModuleClosure.paths)
+                 .filter(ModuleClosure.module_id == module_id))
+    return paths
+
+
+def _lock_edges():
+    """
+    Serialize prerequisite edits by taking the lock on a counters row until
+    the caller commits
+
+    Two edges added at the same time can each be acyclic on their own while
+    creating a cycle together, and paths running through both would be
+    missed, so locking only the modules involved is not enough.
+    """
+    counters = Counter.__table__
+    result = db.session.execute(
+        counters.update()
+        .where(counters.c.name == EDGE_COUNTER)
+        .values(value=counters.c.value + 1))
+    if not result.rowcount:
+        db.session.execute(counters.insert().values(name=EDGE_COUNTER,
+                                                    value=1))
+
+
+def _adjust_closure(module_id, prerequisite_id, sign):
+    """
+    Add (sign=1) or remove (sign=-1) the paths running through the edge
+    module_id -> prerequisite_id
+
+    Path counts are changed by deltas applied in SQL, never overwritten.
+    """
+    below = _dependents(module_id)
+    above = _requirements(prerequisite_id)
+    closure = ModuleClosure.__table__
+
+    existing = set()
+    for chunk in _chunks(below):
+        rows = db.session.query(ModuleClosure.module_id,
+                                ModuleClosure.prerequisite_id).filter(
+                                    ModuleClosure.module_id.in_(chunk))
+        existing.update(key for key in rows if key[1] in above)
+
+    inserts, updates = [], []
+    for dependent, below_paths in below.items():
+        for requirement, above_paths in above.items():
+            delta = sign * below_paths * above_paths
+            if (dependent, requirement) in existing:
+                updates.append(dict(dependent=dependent,
+                                    requirement=requirement, delta=delta))
+            else:
+                inserts.append(dict(module_id=dependent,
+                                    prerequisite_id=requirement,
+                                    paths=delta))
+
+    if updates:
+        db.session.execute(
+            closure.update()
+            .where(and_(closure.c.module_id == bindparam('dependent'),
+                        closure.c.prerequisite_id == bindparam('requirement')))
+            .values(paths=closure.c.paths + bindparam('delta')), updates)
+    if inserts:
+        db.session.execute(closure.insert(), inserts)
+    if sign < 0:
+        for chunk in _chunks(below):
+            db.session.execute(closure.delete().where(and_(
+                closure.c.module_id.in_(chunk), closure.c.paths == 0)))
+
+
+def requires(module_id, prerequisite_id):
+    """
+    Return True if prerequisite_id is a direct or indirect prerequisite
+    of module_id
+    """
+    return db.session.query(exists().where(and_(
+        ModuleClosure.module_id == module_id,
+        ModuleClosure.prerequisite_id == prerequisite_id))).scalar()
+
+
+def add_prerequisite(module_id, prerequisite_id):
+    """
+    Make prerequisite_id a direct prerequisite of module_id
+
+    Raises ValueError if the edge would create a cycle. The caller commits.
+    """
+    _lock_edges()
+    if module_id == prerequisite_id or requires(prerequisite_id, module_id):
+        raise ValueError('Module {} cannot require module {}: '
+                         'this would create a cycle.'.format(
+                             module_id, prerequisite_id))
+
+    if ModulePrerequisite.query.get((module_id, prerequisite_id)):
+        return
+
+    db.session.add(ModulePrerequisite(module_id=module_id,
+                                      prerequisite_id=prerequisite_id))
+    db.session.flush()
+    _adjust_closure(module_id, prerequisite_id, 1)
+
+
+def remove_prerequisite(module_id, prerequisite_id):
+    """
+    Remove a direct prerequisite edge. The caller commits.
+    """
+    _lock_edges()
+    edge = ModulePrerequisite.query.get((module_id, prerequisite_id))
+    if edge is None:
+        return
+
+    db.session.delete(edge)
+    db.session.flush()
+    _adjust_closure(module_id, prerequisite_id, -1)
+
+
+def detach_module(module_id):
+    """
+    Remove every prerequisite edge into or out of a module, e.g. before
+    deleting it. The caller commits.
+    """
+    edges = ModulePrerequisite.query.filter(
+        (ModulePrerequisite.module_id == module_id) |
+        (ModulePrerequisite.prerequisite_id == module_id)).all()
+    for edge in edges:
+        remove_prerequisite(edge.module_id, edge.prerequisite_id)
+
+
+def missing_prerequisite(module_id):
+    """
+    SQL condition that is true when the correlated Student has not
+    completed some prerequisite of module_id
+    """
+    completed = exists().where(and_(
+        Module.id == ModuleClosure.prerequisite_id,
+        Module.take_id == Student.take_id))
+    return exists().where(and_(ModuleClosure.module_id == module_id,
+                               ~completed))
+
+
+def eligible_students(module_id):
+    """
+    Query the students who have completed every prerequisite of module_id
+    """
+    return Student.live().filter(~missing_prerequisite(module_id))
+
+
+def is_eligible(student_id, module_id):
+    """
+    Return True if the student has completed every prerequisite of module_id
+    """
+    return db.session.query(eligible_students(module_id)
+                            .filter(Student.id == student_id)
+                            .exists()).scalar()
@@ -0,0 +1,22 @@
+# app/projections.py
+
+from app import db
+
+# columns read by the admin list templates
+STUDENT_LIST = ('id', 'student_fname', 'student_lname', 'student_number',
+                'contact_mobile', 'contact_email')
+EMPLOYEE_LIST = ('id', 'first_name', 'last_name', 'is_admin',
+                 'department_id', 'role_id')
+COURSE_LIST = ('id', 'course_name', 'description', 'department_id',
+               'enrolment_id', 'role_id')
+
+
+def project(model, names):
+    """
+    Query only the named columns of model
+
+    Rows come back as read-only named tuples that are never added to the
+    session, so there is no per-row object construction or change
+    tracking. Use it for pages and exports that only display data.
+    """
+    return db.session.query(*[getattr(model, name) for name in names])
@@ -0,0 +1,150 @@
+# app/refdata.py
+
+import threading
+from collections import namedtuple
+from operator import attrgetter
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+from flask import g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import db
+from .models import Counter, Department, Enrolment, Include, Offer, Role
+
+# name of the row in the counters table that versions the reference data
+VERSION_COUNTER = 'refdata'
+
+DepartmentRow = namedtuple('DepartmentRow',
+                           'id name description faculty_name offer_id')
+RoleRow = namedtuple('RoleRow', 'id name description')
+OfferRow = namedtuple('OfferRow', 'id offer_year')
+IncludeRow = namedtuple('IncludeRow', 'id term_enrol')
+EnrolmentRow = namedtuple('EnrolmentRow', 'id year_enrol')
+
+RefData = namedtuple('RefData',
+                     'version departments roles offers includes enrolments')
+
+# (RefData field, model, row type) for every cached table
+TABLES = (
+    ('departments', Department, DepartmentRow),
+    ('roles', Role, RoleRow),
+    ('offers', Offer, OfferRow),
+    ('includes', Include, IncludeRow),
+    ('enrolments', Enrolment, EnrolmentRow),
+)
+
+MODELS = tuple(model for _, model, _ in TABLES)
+
+_lock = threading.Lock()
+_cache = None
+
+
+class FrozenMap(Mapping):
+    """
+    Read-only id -> row lookup map, safe to share between threads
+    """
+
+    __slots__ = ('_rows',)
+
+    def __init__(self, rows):
+        self._rows = dict(rows)
+
+    def __getitem__(self, key):
+        return self._rows[key]
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def __len__(self):
+        return len(self._rows)
+
+
+def is_reference(model):
+    """
+    Return True if rows of model are held in the reference-data cache
+    """
+    return model in MODELS
+
+
+def read_version():
+    """
+    Read the current reference-data version from the database
+    """
+    version = db.session.query(Counter.value).filter_by(
+        name=VERSION_COUNTER).scalar()
+    return version or 0
+
+
+def bump_version(session):
+    """
+    Increment the reference-data version inside the session's transaction,
+    so every worker reloads its cache once the change commits
+    """
+    counters = Counter.__table__
+    result = session.execute(
+        counters.update()
+        .where(counters.c.name == VERSION_COUNTER)
+        .values(value=counters.c.value + 1))
+    if not result.rowcount:
+        session.execute(counters.insert().values(name=VERSION_COUNTER,
+                                                 value=1))
+
+
+def _load(version):
+    """
+    Load every reference table into id -> row lookup maps
+    """
+    maps = {}
+    for field, model, row in TABLES:
+        columns = [getattr(model, name) for name in row._fields]
+        maps[field] = FrozenMap((values[0], row(*values)) for values in
+                                db.session.query(*columns)
+                                .order_by(model.id))
+    return RefData(version=version, **maps)
+
+
+def current():
+    """
+    Return the reference data, checking the version at most once per request
+    """
+    global _cache
+
+    if has_request_context() and 'refdata' in g:
+        return g.refdata
+
+    version = read_version()
+    data = _cache
+    if data is None or data.version != version:
+        with _lock:
+            data = _cache
+            if data is None or data.version != version:
+                data = _cache = _load(version)
+
+    if has_request_context():
+        g.refdata = data
+    return data
+
+
+def choices(rows, label):
+    """
+    Build (id, label) select field choices from a lookup map, sorted by label
+    """
+    get_label = attrgetter(label)
+    return [(row.id, get_label(row))
+            for row in sorted(rows.values(), key=get_label)]
+
+
+@event.listens_for(Session, 'before_flush')
+def bump_on_change(session, flush_context, instances):
+    """
+    Bump the version whenever a flush touches a reference table
+    """
+    for obj in session.new | session.dirty | session.deleted:
+        if isinstance(obj, MODELS):
+            bump_version(session)
+            return
@@ -0,0 +1,62 @@
+# app/streaming.py
+
+from flask import (Response, current_app, get_flashed_messages,
+                   stream_with_context)
+
+# rows fetched per database round trip while a page streams
+CHUNK_SIZE = 500
+
+# template output chunks collected before each write to the client
+BUFFER_SIZE = 20
+
+
+class ChunkedRows(object):
+    """
+    Lazily iterate a query in chunks while a template is streamed
+
+    Truth testing only fetches the first row, so templates can keep using
+    "{% if rows %}" without the whole result being loaded.
+    """
+
+    _empty = object()
+
+    def __init__(self, query, chunk_size=CHUNK_SIZE):
+        self._rows = iter(query.yield_per(chunk_size))
+        self._first = None
+
+    def _peek(self):
+        if self._first is None:
+            self._first = next(self._rows, self._empty)
+        return self._first
+
+    def __bool__(self):
+        return self._peek() is not self._empty
+
+    __nonzero__ = __bool__
+
+    def __iter__(self):
+        first = self._peek()
+        if first is self._empty:
+            return
+        yield first
+        for row in self._rows:
+            yield row
+
+
+def stream_template(template_name, **context):
+    """
+    Render a template as a streamed response
+
+    The page header is sent as soon as it is rendered, while rows from
+    ChunkedRows arguments are still being fetched.
+    """
+    app = current_app._get_current_object()
+    app.update_template_context(context)
+
+    # pop flashed messages now: the session cookie is written with the
+    # headers, before the template reads them
+    get_flashed_messages(with_categories=True)
+
+    stream = app.jinja_env.get_template(template_name).stream(context)
+    stream.enable_buffering(BUFFER_SIZE)
+    return Response(stream_with_context(stream))
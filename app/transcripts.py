@@ -0,0 +1,324 @@
+# app/transcripts.py
+
+import os
+import shutil
+import zipfile
+from collections import defaultdict
+from multiprocessing import Pool, cpu_count
+
+import click
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from app import db
+from . import partitions, refdata
+from .models import Lecturer, Module, Student, Tutor
+
+try:
+    import weasyprint
+except ImportError:
+    weasyprint = None
+
+# document type -> template, all rendered from the same pre-fetched data
+TEMPLATES = {
+    'transcript': 'transcripts/transcript.html',
+    'letter': 'transcripts/letter.html',
+}
+DOCUMENTS = tuple(sorted(TEMPLATES))
+
+# students fetched per round trip; also bounds the IN lists of the
+# follow-up module/tutor queries
+CHUNK_SIZE = 500
+
+FORMATS = ('html', 'pdf')
+
+# suffix of files still being written
+PARTIAL = '.partial'
+
+# set in each worker process by _init_worker
+_environment = None
+
+
+def document_name(student_id, fmt, faculty=None, document='transcript'):
+    """
+    File name of a student's document; student ids are only unique within
+    one database, so students of a faculty database get its name as a
+    prefix
+    """
+    name = '{}-{}.{}'.format(document, student_id, fmt)
+    if faculty is None:
+        return name
+    return '{}-{}'.format(partitions.slug(faculty), name)
+
+
+def _fetch_chunks(chunk_size, done, fmt, faculty=None,
+                  documents=('transcript',)):
+    """
+    Yield lists of plain template contexts for every enrolled student of
+    the current database still missing one of documents, loading related
+    rows with one query per chunk
+    """
+    enrolments = refdata.current().enrolments
+    last_id = 0
+    while True:
+        rows = db.session.query(
+            Student.id, Student.student_fname, Student.student_lname,
+            Student.student_number, Student.contact_email,
+            Student.enrolment_id, Student.take_id, Student.tutor_id) \
+            .filter(Student.enrolment_id.isnot(None),
+                    Student.deleted_at.is_(None), Student.id > last_id) \
+            .order_by(Student.id).limit(chunk_size).all()
+        if not rows:
+            return
+        last_id = rows[-1].id
+
+        rows = [row for row in rows
+                if any(document_name(row.id, fmt, faculty, document)
+                       not in done for document in documents)]
+        if not rows:
+            continue
+
+        modules = defaultdict(list)
+        take_ids = set(row.take_id for row in rows) - set([None])
+        if take_ids:
+            for module in db.session.query(
+                    Module.take_id, Module.module_name, Module.description,
+                    Module.Year_completed) \
+                    .filter(Module.take_id.in_(take_ids)) \
+                    .order_by(Module.Year_completed, Module.module_name):
+                modules[module.take_id].append(dict(
+                    module_name=module.module_name,
+                    description=module.description,
+                    Year_completed=module.Year_completed))
+
+        tutors = {}
+        tutor_ids = set(row.tutor_id for row in rows) - set([None])
+        if tutor_ids:
+            for tutor_id, description in db.session.query(
+                    Tutor.id, Tutor.tut_description) \
+                    .filter(Tutor.id.in_(tutor_ids)):
+                tutors[tutor_id] = dict(description=description,
+                                        lecturers=[])
+            for tutor_id, first_name, last_name in db.session.query(
+                    Lecturer.tutor_id, Lecturer.lecturer_fname,
+                    Lecturer.lecturer_lname) \
+                    .filter(Lecturer.tutor_id.in_(tutor_ids)) \
+                    .order_by(Lecturer.lecturer_lname):
+                tutors[tutor_id]['lecturers'].append(
+                    '{} {}'.format(first_name, last_name))
+
+        chunk = []
+        for row in rows:
+            enrolment = enrolments.get(row.enrolment_id)
+            chunk.append(dict(
+                student=dict(
+                    id=row.id,
+                    first_name=row.student_fname,
+                    last_name=row.student_lname,
+                    student_number=row.student_number,
+                    contact_email=row.contact_email,
+                    year_enrol=enrolment.year_enrol if enrolment else None),
+                modules=modules.get(row.take_id, []),
+                tutor=tutors.get(row.tutor_id),
+                faculty=faculty))
+        yield chunk
+
+
+def _init_worker(template_folder):
+    global _environment
+    _environment = Environment(loader=FileSystemLoader(template_folder),
+                               autoescape=select_autoescape(['html']))
+
+
+def _render(job):
+    """
+    Render one document in a worker process, returning (name, bytes)
+    """
+    fmt, document, context = job
+    html = _environment.get_template(TEMPLATES[document]).render(**context)
+    if fmt == 'pdf':
+        data = weasyprint.HTML(string=html).write_pdf()
+    else:
+        data = html.encode('utf-8')
+    return document_name(context['student']['id'], fmt, context['faculty'],
+                         document), data
+
+
+def _write_atomic(path, write):
+    """
+    Call write with a file object for a temporary name, then rename it to
+    path, so a killed run never leaves a truncated file under a final name
+    """
+    partial = path + PARTIAL
+    with open(partial, 'wb') as target:
+        write(target)
+    os.rename(partial, path)
+
+
+def _parts_folder(output):
+    return output + '.parts'
+
+
+def _parts(output):
+    folder = _parts_folder(output)
+    if not os.path.isdir(folder):
+        return []
+    return [os.path.join(folder, name) for name in sorted(os.listdir(folder))
+            if not name.endswith(PARTIAL)]
+
+
+def _existing(output):
+    """
+    Return the names of the documents already written to output
+    """
+    if output.endswith('.zip'):
+        done = set()
+        for path in _parts(output) + [output]:
+            if os.path.exists(path):
+                with zipfile.ZipFile(path) as archive:
+                    done.update(archive.namelist())
+        return done
+    if not os.path.isdir(output):
+        os.makedirs(output)
+    return set(name for name in os.listdir(output)
+               if not name.endswith(PARTIAL))
+
+
+def _write_documents(output, results):
+    for name, data in results:
+        _write_atomic(os.path.join(output, name),
+                      lambda target: target.write(data))
+
+
+def _write_part(output, first_name, results):
+    """
+    Write one chunk to an archive of its own, which is only ever seen
+    complete
+    """
+    folder = _parts_folder(output)
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+
+    def write(target):
+        with zipfile.ZipFile(target, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for name, data in results:
+                archive.writestr(name, data)
+
+    _write_atomic(os.path.join(folder, 'part-{}.zip'.format(first_name)),
+                  write)
+
+
+def _merge_parts(output):
+    """
+    Combine output and the chunk archives into a new output archive, then
+    remove the chunk archives
+    """
+    parts = _parts(output)
+    if not parts:
+        return
+    sources = parts + ([output] if os.path.exists(output) else [])
+
+    def write(target):
+        # a run killed after the rename but before the parts were removed
+        # leaves documents in both
+        seen = set()
+        with zipfile.ZipFile(target, 'w', zipfile.ZIP_DEFLATED) as merged:
+            for path in sources:
+                with zipfile.ZipFile(path) as archive:
+                    for info in archive.infolist():
+                        if info.filename not in seen:
+                            seen.add(info.filename)
+                            merged.writestr(info, archive.read(info))
+
+    _write_atomic(output, write)
+    shutil.rmtree(_parts_folder(output))
+
+
+def generate(app, output, fmt='html', processes=None, chunk_size=CHUNK_SIZE,
+             progress=None, documents=('transcript',)):
+    """
+    Render the given documents (see DOCUMENTS) for every enrolled student
+    into output, which is either a directory or a .zip file
+
+    Every document type is rendered from the same pre-fetched data in one
+    pass over the students. Documents already present in output are
+    skipped, so an interrupted run resumes where it stopped. Every file is
+    written under a temporary name and renamed once complete; a .zip is
+    built from one archive per chunk in <output>.parts, merged when the run
+    finishes. Students of faculty databases are included, their documents
+    prefixed with the faculty name. progress, if given, is called with
+    (rendered, total) after every chunk. Returns the number of documents
+    rendered.
+    """
+    if fmt not in FORMATS:
+        raise ValueError('Unknown transcript format: {}'.format(fmt))
+    for document in documents:
+        if document not in TEMPLATES:
+            raise ValueError('Unknown document type: {}'.format(document))
+    if fmt == 'pdf' and weasyprint is None:
+        raise RuntimeError('PDF transcripts require the weasyprint package.')
+
+    done = _existing(output)
+    total = 0
+    for faculty in partitions.sources():
+        with partitions.use_faculty(faculty):
+            total += Student.live().filter(
+                Student.enrolment_id.isnot(None)).count() * len(documents)
+    total = max(total - len(done), 0)
+    rendered = 0
+
+    template_folder = os.path.join(app.root_path, app.template_folder)
+    pool = Pool(processes or cpu_count(), _init_worker, (template_folder,))
+    try:
+        for faculty in partitions.sources():
+            with partitions.use_faculty(faculty):
+                for chunk in _fetch_chunks(chunk_size, done, fmt, faculty,
+                                           documents):
+                    jobs = [(fmt, document, context)
+                            for context in chunk for document in documents
+                            if document_name(context['student']['id'], fmt,
+                                             faculty, document) not in done]
+                    results = pool.imap_unordered(_render, jobs, chunksize=16)
+                    if output.endswith('.zip'):
+                        first = document_name(chunk[0]['student']['id'], fmt,
+                                              faculty)
+                        _write_part(output, first, results)
+                    else:
+                        _write_documents(output, results)
+                    rendered += len(jobs)
+                    if progress is not None:
+                        progress(rendered, total)
+    finally:
+        pool.close()
+        pool.join()
+
+    if output.endswith('.zip'):
+        _merge_parts(output)
+    return rendered
+
+
+def init_app(app):
+    """
+    Register the transcripts command on the flask CLI
+    """
+    @app.cli.command('transcripts')
+    @click.argument('output')
+    @click.option('--format', 'fmt', type=click.Choice(FORMATS),
+                  default='html', help='Document format.')
+    @click.option('--processes', type=int, default=None,
+                  help='Worker processes (defaults to the number of cores).')
+    @click.option('--chunk-size', type=int, default=CHUNK_SIZE,
+                  help='Students fetched per query.')
+    @click.option('--document', 'documents', type=click.Choice(DOCUMENTS),
+                  multiple=True, default=('transcript',),
+                  help='Document type; repeat to render several in one pass.')
+    def transcripts(output, fmt, processes, chunk_size, documents):
+        """
+        Generate transcripts and enrolment letters for every enrolled
+        student
+        """
+        def progress(rendered, total):
+            click.echo('{}/{} documents rendered'.format(rendered, total))
+
+        rendered = generate(app, output, fmt, processes, chunk_size, progress,
+                            documents)
+        click.echo('Done: {} documents written to {}'.format(rendered, output))
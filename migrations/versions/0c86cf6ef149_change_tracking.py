@@ -0,0 +1,70 @@
+"""change tracking
+
+Revision ID: 0c86cf6ef149
+Revises: 1ce58ff18bde
+Create Date: 2026-10-19 11:48:05.302117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0c86cf6ef149'
+down_revision = '1ce58ff18bde'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # existing rows start without a sequence number, so the change feed
+    # numbers and reports all of them on its first read
+    with op.batch_alter_table('courses', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('change_seq', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('deleted_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_courses_change_seq'), ['change_seq'], unique=False)
+
+    with op.batch_alter_table('employees', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('change_seq', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('deleted_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_employees_change_seq'), ['change_seq'], unique=False)
+
+    with op.batch_alter_table('enrolments', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('change_seq', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('deleted_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_enrolments_change_seq'), ['change_seq'], unique=False)
+
+    with op.batch_alter_table('students', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('change_seq', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('deleted_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_students_change_seq'), ['change_seq'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('students', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_students_change_seq'))
+        batch_op.drop_column('updated_at')
+        batch_op.drop_column('deleted_at')
+        batch_op.drop_column('change_seq')
+
+    with op.batch_alter_table('enrolments', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_enrolments_change_seq'))
+        batch_op.drop_column('updated_at')
+        batch_op.drop_column('deleted_at')
+        batch_op.drop_column('change_seq')
+
+    with op.batch_alter_table('employees', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_employees_change_seq'))
+        batch_op.drop_column('updated_at')
+        batch_op.drop_column('deleted_at')
+        batch_op.drop_column('change_seq')
+
+    with op.batch_alter_table('courses', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_courses_change_seq'))
+        batch_op.drop_column('updated_at')
+        batch_op.drop_column('deleted_at')
+        batch_op.drop_column('change_seq')
@@ -0,0 +1,45 @@
+"""module prerequisites
+
+Revision ID: 1ce58ff18bde
+Revises: ce72867e96bc
+Create Date: 2026-10-19 11:02:16.448370
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1ce58ff18bde'
+down_revision = 'ce72867e96bc'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('module_closure',
+    sa.Column('module_id', sa.Integer(), nullable=False),
+    sa.Column('prerequisite_id', sa.Integer(), nullable=False),
+    sa.Column('paths', sa.BigInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['module_id'], ['modules.id'], ),
+    sa.ForeignKeyConstraint(['prerequisite_id'], ['modules.id'], ),
+    sa.PrimaryKeyConstraint('module_id', 'prerequisite_id')
+    )
+    with op.batch_alter_table('module_closure', schema=None) as batch_op:
+        batch_op.create_index('ix_module_closure_prerequisite_id', ['prerequisite_id', 'module_id'], unique=False)
+
+    op.create_table('module_prerequisites',
+    sa.Column('module_id', sa.Integer(), nullable=False),
+    sa.Column('prerequisite_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['module_id'], ['modules.id'], ),
+    sa.ForeignKeyConstraint(['prerequisite_id'], ['modules.id'], ),
+    sa.PrimaryKeyConstraint('module_id', 'prerequisite_id')
+    )
+
+
+def downgrade():
+    op.drop_table('module_prerequisites')
+    with op.batch_alter_table('module_closure', schema=None) as batch_op:
+        batch_op.drop_index('ix_module_closure_prerequisite_id')
+
+    op.drop_table('module_closure')
@@ -0,0 +1,44 @@
+"""student numbers
+
+Revision ID: 383834524327
+Revises: 6b34c1f46286
+Create Date: 2026-10-19 13:05:51.840216
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '383834524327'
+down_revision = '6b34c1f46286'
+branch_labels = None
+depends_on = None
+
+# app.models.FIRST_STUDENT_NUMBER and STUDENT_NUMBER_BLOCK when written
+FIRST_STUDENT_NUMBER = 100000
+STUDENT_NUMBER_BLOCK = 100
+
+
+def upgrade():
+    with op.batch_alter_table('students', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_students_student_number', ['student_number'])
+
+    bind = op.get_bind()
+    if bind.dialect.supports_sequences:
+        # start above the numbers already in use; other databases seed the
+        # counters row the same way on first allocation
+        highest = bind.execute(
+            sa.text('SELECT max(student_number) FROM students')).scalar()
+        op.execute(sa.schema.CreateSequence(sa.Sequence(
+            'student_number_seq',
+            start=max(FIRST_STUDENT_NUMBER, (highest or 0) + 1),
+            increment=STUDENT_NUMBER_BLOCK)))
+
+
+def downgrade():
+    if op.get_bind().dialect.supports_sequences:
+        op.execute(sa.schema.DropSequence(sa.Sequence('student_number_seq')))
+
+    with op.batch_alter_table('students', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_students_student_number', type_='unique')
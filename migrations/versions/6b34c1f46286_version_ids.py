@@ -0,0 +1,44 @@
+"""version ids
+
+Revision ID: 6b34c1f46286
+Revises: 0c86cf6ef149
+Create Date: 2026-10-19 12:40:27.613094
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6b34c1f46286'
+down_revision = '0c86cf6ef149'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('departments', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version_id', sa.Integer(), server_default='1', nullable=False))
+
+    with op.batch_alter_table('employees', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version_id', sa.Integer(), server_default='1', nullable=False))
+
+    with op.batch_alter_table('roles', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version_id', sa.Integer(), server_default='1', nullable=False))
+
+    with op.batch_alter_table('students', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version_id', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('students', schema=None) as batch_op:
+        batch_op.drop_column('version_id')
+
+    with op.batch_alter_table('roles', schema=None) as batch_op:
+        batch_op.drop_column('version_id')
+
+    with op.batch_alter_table('employees', schema=None) as batch_op:
+        batch_op.drop_column('version_id')
+
+    with op.batch_alter_table('departments', schema=None) as batch_op:
+        batch_op.drop_column('version_id')
@@ -0,0 +1,70 @@
+"""on delete set null for every foreign key
+
+Revision ID: 8d2df0296c51
+Revises: e65b91ec157f
+Create Date: 2026-10-19 10:14:37.905512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d2df0296c51'
+down_revision = 'e65b91ec157f'
+branch_labels = None
+depends_on = None
+
+# (table, column, referred table) for every foreign key in the schema
+FOREIGN_KEYS = (
+    ('courses', 'department_id', 'departments'),
+    ('courses', 'enrolment_id', 'enrolments'),
+    ('courses', 'include_id', 'includes'),
+    ('courses', 'offer_id', 'offers'),
+    ('courses', 'role_id', 'roles'),
+    ('departments', 'offer_id', 'offers'),
+    ('employees', 'department_id', 'departments'),
+    ('employees', 'lecturer_id', 'lecturers'),
+    ('employees', 'role_id', 'roles'),
+    ('lecturers', 'teach_id', 'teaches'),
+    ('lecturers', 'tutor_id', 'tutors'),
+    ('modules', 'include_id', 'includes'),
+    ('modules', 'take_id', 'takes'),
+    ('modules', 'teach_id', 'teaches'),
+    ('students', 'enrolment_id', 'enrolments'),
+    ('students', 'take_id', 'takes'),
+    ('students', 'tutor_id', 'tutors'),
+)
+
+# names the unnamed keys SQLite reflects, so batch mode can drop them
+NAMING_CONVENTION = {
+    'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s',
+}
+
+
+def _recreate_foreign_keys(ondelete):
+    inspector = sa.inspect(op.get_bind())
+    for table in sorted(set(table for table, _, _ in FOREIGN_KEYS)):
+        existing = dict((tuple(key['constrained_columns']), key['name'])
+                        for key in inspector.get_foreign_keys(table))
+        with op.batch_alter_table(
+                table, naming_convention=NAMING_CONVENTION) as batch_op:
+            for key_table, column, referred in FOREIGN_KEYS:
+                if key_table != table:
+                    continue
+                name = NAMING_CONVENTION['fk'] % dict(
+                    table_name=table, column_0_name=column,
+                    referred_table_name=referred)
+                if (column,) in existing:
+                    batch_op.drop_constraint(existing[(column,)] or name,
+                                             type_='foreignkey')
+                batch_op.create_foreign_key(name, referred, [column], ['id'],
+                                            ondelete=ondelete)
+
+
+def upgrade():
+    _recreate_foreign_keys('SET NULL')
+
+
+def downgrade():
+    _recreate_foreign_keys(None)
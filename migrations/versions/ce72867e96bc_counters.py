@@ -0,0 +1,28 @@
+"""counters
+
+Revision ID: ce72867e96bc
+Revises: 8d2df0296c51
+Create Date: 2026-10-19 10:31:52.118904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ce72867e96bc'
+down_revision = '8d2df0296c51'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('counters',
+    sa.Column('name', sa.String(length=60), nullable=False),
+    sa.Column('value', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('counters')
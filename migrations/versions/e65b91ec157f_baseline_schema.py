@@ -0,0 +1,184 @@
+"""baseline schema
+
+Revision ID: e65b91ec157f
+Revises: 
+Create Date: 2026-10-19 10:02:11.482113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e65b91ec157f'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('enrolments',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('year_enrol', sa.String(length=60), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('includes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('term_enrol', sa.String(length=60), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('includes', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_includes_term_enrol'), ['term_enrol'], unique=False)
+
+    op.create_table('offers',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('offer_year', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('roles',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=60), nullable=True),
+    sa.Column('description', sa.String(length=200), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    with op.batch_alter_table('roles', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_roles_description'), ['description'], unique=False)
+
+    op.create_table('takes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('teaches',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('teach_date', sa.String(length=60), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('tutors',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('tut_description', sa.String(length=150), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('departments',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=60), nullable=True),
+    sa.Column('description', sa.String(length=150), nullable=True),
+    sa.Column('faculty_name', sa.String(length=60), nullable=True),
+    sa.Column('offer_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['offer_id'], ['offers.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    with op.batch_alter_table('departments', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_departments_faculty_name'), ['faculty_name'], unique=False)
+
+    op.create_table('lecturers',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('lecturer_fname', sa.String(length=60), nullable=True),
+    sa.Column('lecturer_lname', sa.String(length=60), nullable=True),
+    sa.Column('Year_joined', sa.Integer(), nullable=True),
+    sa.Column('contact_mobile', sa.Integer(), nullable=True),
+    sa.Column('contact_email', sa.String(length=60), nullable=True),
+    sa.Column('teach_id', sa.Integer(), nullable=True),
+    sa.Column('tutor_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['teach_id'], ['teaches.id'], ),
+    sa.ForeignKeyConstraint(['tutor_id'], ['tutors.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('modules',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('module_name', sa.String(length=60), nullable=True),
+    sa.Column('description', sa.String(length=150), nullable=True),
+    sa.Column('Year_completed', sa.Integer(), nullable=True),
+    sa.Column('take_id', sa.Integer(), nullable=True),
+    sa.Column('teach_id', sa.Integer(), nullable=True),
+    sa.Column('include_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['include_id'], ['includes.id'], ),
+    sa.ForeignKeyConstraint(['take_id'], ['takes.id'], ),
+    sa.ForeignKeyConstraint(['teach_id'], ['teaches.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('students',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('student_fname', sa.String(length=60), nullable=True),
+    sa.Column('student_lname', sa.String(length=60), nullable=True),
+    sa.Column('student_number', sa.Integer(), nullable=True),
+    sa.Column('contact_mobile', sa.String(length=60), nullable=True),
+    sa.Column('contact_email', sa.String(length=60), nullable=True),
+    sa.Column('enrolment_id', sa.Integer(), nullable=True),
+    sa.Column('take_id', sa.Integer(), nullable=True),
+    sa.Column('tutor_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['enrolment_id'], ['enrolments.id'], ),
+    sa.ForeignKeyConstraint(['take_id'], ['takes.id'], ),
+    sa.ForeignKeyConstraint(['tutor_id'], ['tutors.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('courses',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('course_name', sa.String(length=60), nullable=True),
+    sa.Column('description', sa.String(length=150), nullable=True),
+    sa.Column('offer_id', sa.Integer(), nullable=True),
+    sa.Column('include_id', sa.Integer(), nullable=True),
+    sa.Column('enrolment_id', sa.Integer(), nullable=True),
+    sa.Column('department_id', sa.Integer(), nullable=True),
+    sa.Column('role_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['department_id'], ['departments.id'], ),
+    sa.ForeignKeyConstraint(['enrolment_id'], ['enrolments.id'], ),
+    sa.ForeignKeyConstraint(['include_id'], ['includes.id'], ),
+    sa.ForeignKeyConstraint(['offer_id'], ['offers.id'], ),
+    sa.ForeignKeyConstraint(['role_id'], ['roles.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('course_name')
+    )
+    op.create_table('employees',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(length=60), nullable=True),
+    sa.Column('username', sa.String(length=60), nullable=True),
+    sa.Column('first_name', sa.String(length=60), nullable=True),
+    sa.Column('last_name', sa.String(length=60), nullable=True),
+    sa.Column('password_hash', sa.String(length=128), nullable=True),
+    sa.Column('department_id', sa.Integer(), nullable=True),
+    sa.Column('role_id', sa.Integer(), nullable=True),
+    sa.Column('lecturer_id', sa.Integer(), nullable=True),
+    sa.Column('is_admin', sa.Boolean(), nullable=True),
+    sa.ForeignKeyConstraint(['department_id'], ['departments.id'], ),
+    sa.ForeignKeyConstraint(['lecturer_id'], ['lecturers.id'], ),
+    sa.ForeignKeyConstraint(['role_id'], ['roles.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('employees', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_employees_email'), ['email'], unique=True)
+        batch_op.create_index(batch_op.f('ix_employees_first_name'), ['first_name'], unique=False)
+        batch_op.create_index(batch_op.f('ix_employees_last_name'), ['last_name'], unique=False)
+        batch_op.create_index(batch_op.f('ix_employees_username'), ['username'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('employees', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_employees_username'))
+        batch_op.drop_index(batch_op.f('ix_employees_last_name'))
+        batch_op.drop_index(batch_op.f('ix_employees_first_name'))
+        batch_op.drop_index(batch_op.f('ix_employees_email'))
+
+    op.drop_table('employees')
+    op.drop_table('courses')
+    op.drop_table('students')
+    op.drop_table('modules')
+    op.drop_table('lecturers')
+    with op.batch_alter_table('departments', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_departments_faculty_name'))
+
+    op.drop_table('departments')
+    op.drop_table('tutors')
+    op.drop_table('teaches')
+    op.drop_table('takes')
+    with op.batch_alter_table('roles', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_roles_description'))
+
+    op.drop_table('roles')
+    op.drop_table('offers')
+    with op.batch_alter_table('includes', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_includes_term_enrol'))
+
+    op.drop_table('includes')
+    op.drop_table('enrolments')
@@ -0,0 +1,96 @@
+# tests/benchmarks/test_prerequisites_benchmark.py
+
+import os
+import time
+
+from app import db, prerequisites
+from app.models import Module, ModuleClosure
+from tests.utils import QueryCounter
+
+# BENCH_DEPTH=1000 for a catalogue closer to production size
+DEPTH = int(os.environ.get('BENCH_DEPTH', 150))
+CHAINS = 4
+
+
+def test_deep_chains(app):
+    with app.app_context():
+        db.session.bulk_insert_mappings(Module, [
+            {'module_name': 'M{}'.format(i)} for i in range(DEPTH * CHAINS)])
+        db.session.commit()
+        ids = [id for id, in db.session.query(Module.id).order_by(Module.id)]
+        chains = [ids[i * DEPTH:(i + 1) * DEPTH] for i in range(CHAINS)]
+
+        started = time.time()
+        for chain in chains:
+            for module, prerequisite in zip(chain[1:], chain):
+                prerequisites.add_prerequisite(module, prerequisite)
+            db.session.commit()
+        build = time.time() - started
+        per_chain = DEPTH * (DEPTH - 1) // 2
+        assert ModuleClosure.query.count() == CHAINS * per_chain
+
+        # joining the chains end to start multiplies the reachable pairs
+        tail, head = chains[0][-1], chains[1][0]
+        started = time.time()
+        with QueryCounter(db.engine) as queries:
+            prerequisites.add_prerequisite(head, tail)
+            db.session.commit()
+        join = time.time() - started
+        assert queries.count < 20
+        assert prerequisites.requires(chains[1][-1], chains[0][0])
+
+        started = time.time()
+        prerequisites.remove_prerequisite(head, tail)
+        db.session.commit()
+        split = time.time() - started
+        assert ModuleClosure.query.count() == CHAINS * per_chain
+
+        started = time.time()
+        assert prerequisites.eligible_students(chains[0][-1]).count() == 0
+        eligible = time.time() - started
+
+    print('\n{} chains of depth {}: build {:.2f}s, join {:.3f}s, '
+          'split {:.3f}s, eligibility {:.4f}s'.format(
+              CHAINS, DEPTH, build, join, split, eligible))
+
+
+# each module requires every module of the term before, so path counts
+# grow as WIDTH ** depth and pass 2 ** 31 at the top layer
+WIDTH = int(os.environ.get('BENCH_WIDTH', 6))
+LAYERS = 14
+
+
+def test_wide_layered_catalogue(app):
+    with app.app_context():
+        db.session.bulk_insert_mappings(Module, [
+            {'module_name': 'M{}'.format(i)} for i in range(WIDTH * LAYERS)])
+        db.session.commit()
+        ids = [id for id, in db.session.query(Module.id).order_by(Module.id)]
+        layers = [ids[i * WIDTH:(i + 1) * WIDTH] for i in range(LAYERS)]
+
+        started = time.time()
+        for below, above in zip(layers, layers[1:]):
+            for module in above:
+                for prerequisite in below:
+                    prerequisites.add_prerequisite(module, prerequisite)
+            db.session.commit()
+        build = time.time() - started
+
+        top, bottom = layers[-1][0], layers[0][0]
+        paths = db.session.query(ModuleClosure.paths).filter_by(
+            module_id=top, prerequisite_id=bottom).scalar()
+        assert paths == WIDTH ** (LAYERS - 2)
+        assert paths > 2 ** 31
+
+        # removing one edge near the bottom changes every count above it
+        started = time.time()
+        prerequisites.remove_prerequisite(layers[1][0], bottom)
+        db.session.commit()
+        split = time.time() - started
+        paths = db.session.query(ModuleClosure.paths).filter_by(
+            module_id=top, prerequisite_id=bottom).scalar()
+        assert paths == WIDTH ** (LAYERS - 3) * (WIDTH - 1)
+
+    print('\n{} layers of {}: build {:.2f}s, split {:.3f}s, '
+          'largest path count {}'.format(LAYERS, WIDTH, build, split,
+                                         WIDTH ** (LAYERS - 2)))
@@ -0,0 +1,73 @@
+# tests/benchmarks/test_projection_benchmark.py
+
+import os
+import time
+import tracemalloc
+
+from app import db
+from app.models import Student
+from app.projections import STUDENT_LIST, project
+from app.streaming import ChunkedRows
+
+ROWS = int(os.environ.get('BENCH_ROWS', 100000))
+
+
+def measure(load):
+    """
+    Return (result, CPU seconds, peak traced bytes) for load()
+    """
+    db.session.expire_all()
+    tracemalloc.start()
+    started = time.process_time()
+    try:
+        result = load()
+        cpu = time.process_time() - started
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    db.session.expunge_all()
+    return result, cpu, peak
+
+
+def test_entity_versus_projection_loading(app):
+    with app.app_context():
+        db.session.execute(Student.__table__.insert(), [
+            dict(student_fname='First{}'.format(i),
+                 student_lname='Last{}'.format(i),
+                 student_number=100000 + i,
+                 contact_mobile='0123456789',
+                 contact_email='s{}@example.com'.format(i))
+            for i in range(ROWS)])
+        db.session.commit()
+
+        def entities():
+            return len(Student.live().order_by(Student.id).all())
+
+        def projection():
+            return len(project(Student, STUDENT_LIST)
+                       .filter(Student.deleted_at.is_(None))
+                       .order_by(Student.id).all())
+
+        def streamed():
+            return sum(1 for _ in ChunkedRows(
+                project(Student, STUDENT_LIST)
+                .filter(Student.deleted_at.is_(None))
+                .order_by(Student.id)))
+
+        results = dict((name, measure(load)) for name, load in (
+            ('entities', entities), ('projection', projection),
+            ('streamed', streamed)))
+
+    print('')
+    for name in ('entities', 'projection', 'streamed'):
+        count, cpu, peak = results[name]
+        assert count == ROWS
+        print('{:>10}: {} rows, {:.2f}s CPU, {:.1f} MB peak'.format(
+            name, count, cpu, peak / 1024.0 / 1024))
+
+    _, entity_cpu, entity_peak = results['entities']
+    _, projection_cpu, projection_peak = results['projection']
+    _, _, streamed_peak = results['streamed']
+    assert projection_peak < entity_peak / 2
+    assert projection_cpu < entity_cpu
+    assert streamed_peak < projection_peak / 10
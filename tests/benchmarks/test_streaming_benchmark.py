@@ -0,0 +1,50 @@
+# tests/benchmarks/test_streaming_benchmark.py
+
+import os
+import time
+
+from app import db
+from app.models import Student
+
+ROWS = int(os.environ.get('BENCH_ROWS', 20000))
+
+
+def timed_get(client, url, encoding):
+    headers = {'Accept-Encoding': encoding} if encoding else {}
+    started = time.time()
+    response = client.get(url, headers=headers, buffered=False)
+    first = None
+    size = 0
+    try:
+        for chunk in response.response:
+            if chunk and first is None:
+                first = time.time() - started
+            size += len(chunk)
+    finally:
+        response.close()
+    return first, time.time() - started, size
+
+
+def test_student_list_ttfb_and_bytes(app, admin_client):
+    with app.app_context():
+        db.session.execute(Student.__table__.insert(), [
+            dict(student_fname='First{}'.format(i),
+                 student_lname='Last{}'.format(i),
+                 student_number=100000 + i,
+                 contact_email='s{}@example.com'.format(i))
+            for i in range(ROWS)])
+        db.session.commit()
+
+    print('')
+    results = {}
+    for encoding in (None, 'gzip', 'br'):
+        first, total, size = results[encoding] = timed_get(
+            admin_client, '/admin/students', encoding)
+        print('{:>8}: first byte {:.3f}s, complete {:.3f}s, {} bytes'.format(
+            encoding or 'identity', first, total, size))
+
+    for encoding, (first, total, size) in results.items():
+        # the header is sent long before the last row is rendered
+        assert first < total / 5
+        if encoding:
+            assert size < results[None][2] / 5
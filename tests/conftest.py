@@ -0,0 +1,86 @@
+# tests/conftest.py
+
+import sys
+import types
+
+import flask
+import pytest
+
+from tests.utils import login
+
+
+class TestingConfig(object):
+    """
+    Configuration for the test suite
+    """
+    TESTING = True
+    SECRET_KEY = 'testing'
+    WTF_CSRF_ENABLED = False
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+
+# config.py and instance/config.py hold deployment settings and are kept
+# out of the repository, so the tests provide their own
+config = types.ModuleType('config')
+config.app_config = {'testing': TestingConfig}
+sys.modules['config'] = config
+
+
+@pytest.fixture
+def settings():
+    """
+    Extra configuration for the app fixture; override in a test module
+    """
+    return {}
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch, settings):
+    """
+    An app backed by a fresh SQLite file, with the schema created
+    """
+    monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI',
+                        'sqlite:///{}'.format(tmp_path / 'test.db'),
+                        raising=False)
+    for key, value in settings.items():
+        monkeypatch.setattr(TestingConfig, key, value, raising=False)
+
+    from_pyfile = flask.Config.from_pyfile
+    monkeypatch.setattr(
+        flask.Config, 'from_pyfile',
+        lambda self, filename, silent=False: from_pyfile(self, filename,
+                                                         silent=True))
+
+    from app import allocator, create_app, db, refdata
+    monkeypatch.setattr(refdata, '_cache', None)
+    monkeypatch.setattr(allocator, '_student_numbers',
+                        allocator.BlockAllocator(allocator.reserve))
+
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def admin_client(app):
+    """
+    A test client logged in as an admin
+    """
+    from app import db
+    from app.models import Employee
+
+    with app.app_context():
+        admin = Employee(email='admin@example.com', username='admin',
+                         first_name='Ada', last_name='Admin',
+                         password='admin', is_admin=True)
+        db.session.add(admin)
+        db.session.commit()
+        admin_id = admin.id
+
+    client = app.test_client()
+    login(client, admin_id)
+    return client
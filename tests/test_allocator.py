@@ -0,0 +1,98 @@
+# tests/test_allocator.py
+
+import threading
+
+from app import allocator, db
+from app.admin import views
+from app.models import FIRST_STUDENT_NUMBER, Student
+
+WORKERS = 8
+PER_WORKER = 250
+
+STUDENT = dict(student_fname='Ada', student_lname='Lovelace',
+               contact_mobile='123456', contact_email='ada@example.com')
+
+
+def add_students(numbers):
+    db.session.execute(Student.__table__.insert(), [
+        dict(student_fname='S{}'.format(number), student_number=number)
+        for number in numbers])
+    db.session.commit()
+
+
+def test_parallel_allocators_never_collide(app):
+    # imported numbers, and ones typed in by hand ahead of the counter
+    typed = [FIRST_STUDENT_NUMBER + 10 ** 4 + i for i in (5, 150, 420)]
+    with app.app_context():
+        add_students(list(range(FIRST_STUDENT_NUMBER,
+                                FIRST_STUDENT_NUMBER + 10 ** 4)) + typed)
+
+    allocated = []
+    errors = []
+
+    def worker():
+        # one allocator per worker process in production
+        numbers = allocator.BlockAllocator(allocator.reserve)
+        try:
+            with app.app_context():
+                mine = [numbers.next() for _ in range(PER_WORKER)]
+                add_students(mine)
+            allocated.extend(mine)
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=worker) for _ in range(WORKERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(allocated) == len(set(allocated)) == WORKERS * PER_WORKER
+    assert min(allocated) >= FIRST_STUDENT_NUMBER + 10 ** 4
+    assert not set(typed) & set(allocated)
+
+
+def test_duplicate_typed_number_is_a_form_error(app, admin_client):
+    with app.app_context():
+        add_students([100001])
+
+    response = admin_client.post('/admin/students/add', data=dict(
+        STUDENT, student_number='100001'))
+
+    assert response.status_code == 200
+    assert b'This student number is already in use.' in response.data
+    with app.app_context():
+        assert Student.query.count() == 1
+
+
+def test_taken_allocated_number_is_retried(app, admin_client, monkeypatch):
+    with app.app_context():
+        add_students([100001])
+    numbers = iter([100001, 100002])
+    monkeypatch.setattr(views, 'allocate_student_number',
+                        lambda: next(numbers))
+
+    response = admin_client.post('/admin/students/add', data=STUDENT)
+
+    assert response.status_code == 302
+    with app.app_context():
+        assert Student.query.filter_by(student_fname='Ada').one() \
+            .student_number == 100002
+
+
+def test_edit_to_taken_number_is_a_form_error(app, admin_client):
+    with app.app_context():
+        add_students([100001, 100002])
+        student = Student.query.filter_by(student_number=100002).one()
+        url = '/admin/students/edit/{}'.format(student.id)
+
+    response = admin_client.post(url, data=dict(
+        STUDENT, student_number='100001', version_id='1'))
+
+    assert response.status_code == 200
+    assert b'This value is already in use.' in response.data
+    assert b'Someone else changed this record' not in response.data
+    with app.app_context():
+        student = Student.query.filter_by(student_number=100002).one()
+        assert student.student_fname == 'S100002'
@@ -0,0 +1,86 @@
+# tests/test_assets.py
+
+import os
+import re
+import shutil
+
+import pytest
+
+from app import assets
+
+STATIC = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'app',
+                      'static')
+
+
+@pytest.fixture
+def static_folder(tmp_path):
+    """
+    A copy of the static files, without any earlier build
+    """
+    folder = str(tmp_path / 'static')
+    shutil.copytree(STATIC, folder,
+                    ignore=shutil.ignore_patterns(assets.BUILD_DIR))
+    return folder
+
+
+def built_files(static_folder):
+    build = os.path.join(static_folder, assets.BUILD_DIR)
+    return set(os.path.relpath(os.path.join(root, name), static_folder)
+               for root, _, names in os.walk(build) for name in names)
+
+
+def test_vendored_files_are_committed():
+    assert assets.missing_vendor(STATIC) == []
+
+
+def test_build_fails_without_vendored_files(static_folder):
+    shutil.rmtree(os.path.join(static_folder, 'vendor', 'font-awesome'))
+
+    with pytest.raises(RuntimeError) as error:
+        assets.Builder(static_folder).build()
+    assert 'font-awesome/4.7.0/css/font-awesome.min.css' in str(error.value)
+    assert not os.path.exists(os.path.join(static_folder, assets.BUILD_DIR))
+
+
+def test_rebuild_keeps_earlier_files(static_folder):
+    assets.Builder(static_folder).build()
+    first = assets.load_manifest(static_folder)['assets']
+    before = built_files(static_folder)
+
+    with open(os.path.join(static_folder, 'css', 'style.css'), 'a') as css:
+        css.write('\nbody { color: #333; }\n')
+    assets.Builder(static_folder).build()
+    second = assets.load_manifest(static_folder)['assets']
+    after = built_files(static_folder)
+
+    assert second['css/style.css'] != first['css/style.css']
+    assert second['vendor/bootstrap/3.3.7/css/bootstrap.min.css'] == \
+        first['vendor/bootstrap/3.3.7/css/bootstrap.min.css']
+    # pages rendered against the first manifest keep working
+    assert before <= after
+    assert not [name for name in after if name.endswith('.partial')]
+
+
+def test_fonts_are_rewritten_to_built_names(static_folder):
+    assets.Builder(static_folder).build()
+    manifest = assets.load_manifest(static_folder)['assets']
+    built = manifest['vendor/font-awesome/4.7.0/css/font-awesome.min.css']
+    with open(os.path.join(static_folder, *built.split('/'))) as css:
+        urls = re.findall(r'url\(([^)?#]+)', css.read())
+
+    assert urls
+    folder = os.path.dirname(os.path.join(static_folder, *built.split('/')))
+    for url in urls:
+        assert re.search(r'\.[0-9a-f]{10}\.', url)
+        assert os.path.exists(os.path.normpath(os.path.join(folder, url)))
+
+
+def test_pages_use_local_vendored_files(app):
+    client = app.test_client()
+    page = client.get('/login').data.decode('utf-8')
+    links = re.findall(r'href="(/static/vendor/[^"]+)"', page)
+
+    assert len(links) == 2
+    assert 'bootstrapcdn' not in page
+    for link in links:
+        assert client.get(link).status_code == 200
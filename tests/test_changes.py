@@ -0,0 +1,177 @@
+# tests/test_changes.py
+
+import threading
+
+from app import changes, db
+from app.models import Course, Department, Employee, Enrolment, Student
+from tests.utils import QueryCounter, login
+
+ROUNDS = 15
+
+
+def snapshot():
+    """
+    Every tracked row as the feed would serialize it
+    """
+    rows = {}
+    for name, model, excluded in changes.FEEDS:
+        columns = [column for column in model.__table__.columns
+                   if column.name not in excluded]
+        for row in db.session.query(*columns):
+            rows[(name, row.id)] = dict(
+                (key, changes._serialize(value))
+                for key, value in zip(row.keys(), row))
+    return rows
+
+
+def read_page(client, since, limit):
+    data = client.get('/admin/changes?since={}&limit={}'.format(
+        since, limit)).get_json()
+    seqs = [change['seq'] for change in data['changes']]
+    assert seqs == sorted(set(seqs))
+    assert all(seq > int(since) for seq in seqs)
+    assert len(seqs) <= limit
+    return data
+
+
+def write_students(app, prefix):
+    with app.app_context():
+        for i in range(ROUNDS):
+            student = Student(student_fname='{}{}'.format(prefix, i))
+            db.session.add(student)
+            db.session.commit()
+            student.student_lname = 'Edited'
+            db.session.commit()
+            if i % 3 == 0:
+                changes.soft_delete(student)
+                db.session.commit()
+
+
+def delete_departments(app, admin_id):
+    client = app.test_client()
+    login(client, admin_id)
+    for i in range(ROUNDS // 3):
+        with app.app_context():
+            department = Department(name='D{}'.format(i), description='')
+            db.session.add(department)
+            db.session.flush()
+            db.session.add(Employee(email='e{}@example.com'.format(i),
+                                    username='e{}'.format(i),
+                                    department_id=department.id))
+            db.session.add(Course(course_name='C{}'.format(i),
+                                  department_id=department.id))
+            db.session.commit()
+            department_id = department.id
+        # the ON DELETE rule changes the employee and course behind the ORM
+        assert client.get('/admin/departments/delete/{}'.format(
+            department_id)).status_code == 302
+
+
+def test_paging_with_concurrent_writers(app, admin_client):
+    with app.app_context():
+        admin_id = Employee.query.filter_by(username='admin').one().id
+
+    writers = [threading.Thread(target=write_students, args=(app, prefix))
+               for prefix in 'AB']
+    writers.append(threading.Thread(target=delete_departments,
+                                    args=(app, admin_id)))
+    for writer in writers:
+        writer.start()
+
+    replica, cursor = {}, '0'
+    while any(writer.is_alive() for writer in writers):
+        data = read_page(admin_client, cursor, 7)
+        for change in data['changes']:
+            replica[(change['table'], change['row']['id'])] = change['row']
+        cursor = data['cursor']
+    for writer in writers:
+        writer.join()
+
+    while True:
+        data = read_page(admin_client, cursor, 7)
+        for change in data['changes']:
+            replica[(change['table'], change['row']['id'])] = change['row']
+        cursor = data['cursor']
+        if not data['more']:
+            break
+
+    with app.app_context():
+        expected = snapshot()
+    assert replica == expected
+    assert len([key for key, row in replica.items()
+                if key[0] == 'students' and row['deleted_at']]) == 10
+    assert not any(row['department_id'] for key, row in replica.items()
+                   if key[0] in ('employees', 'courses'))
+
+
+def test_pages_and_cursor(app):
+    with app.app_context():
+        db.session.add_all(Enrolment(year_enrol=str(year))
+                           for year in range(2010, 2015))
+        db.session.commit()
+
+        pages = []
+        since = 0
+        for _ in range(4):
+            page, since, more = changes.changes_since(since, limit=2)
+            pages.append(([change['row']['year_enrol'] for change in page],
+                          since, more))
+
+    assert pages == [
+        (['2010', '2011'], '2', True),
+        (['2012', '2013'], '4', True),
+        (['2014'], '5', False),
+        ([], '5', False),
+    ]
+
+
+def test_changed_row_is_reported_again(app):
+    with app.app_context():
+        enrolment = Enrolment(year_enrol='2010')
+        db.session.add(enrolment)
+        db.session.commit()
+        page, since, _ = changes.changes_since(0)
+        assert [change['seq'] for change in page] == [1]
+
+        enrolment.year_enrol = '2011'
+        db.session.commit()
+        page, since, _ = changes.changes_since(since)
+        assert [(change['seq'], change['row']['year_enrol'])
+                for change in page] == [(2, '2011')]
+
+
+def test_writers_do_not_lock_the_counter(app):
+    with app.app_context():
+        with QueryCounter(db.engine) as queries:
+            student = Student(student_fname='Ada')
+            db.session.add(student)
+            db.session.commit()
+            student.student_lname = 'Lovelace'
+            db.session.commit()
+        assert not [statement for statement in queries.statements
+                    if 'counters' in statement]
+
+
+def test_malformed_cursor_is_rejected(admin_client):
+    assert admin_client.get('/admin/changes?since=abc').status_code == 400
+
+
+def test_orm_delete_becomes_soft_delete(app):
+    with app.app_context():
+        student = Student(student_fname='Ada')
+        db.session.add(student)
+        db.session.commit()
+        _, since, _ = changes.changes_since(0)
+
+        db.session.delete(student)
+        db.session.commit()
+        student_id = student.id
+
+        db.session.expunge_all()
+        deleted = Student.query.get(student_id)
+        assert deleted is not None and deleted.deleted_at is not None
+        assert Student.live().count() == 0
+
+        page, _, _ = changes.changes_since(since)
+        assert [(change['table'], change['op'], change['row']['id'])
+                for change in page] == [('students', 'delete', student_id)]
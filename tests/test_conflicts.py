@@ -0,0 +1,105 @@
+# tests/test_conflicts.py
+
+import re
+import threading
+
+import pytest
+
+from app import db
+from app.admin.forms import DepartmentForm
+from app.admin.views import save_edit
+from app.models import Department, Employee, Student
+from tests.utils import login
+
+STUDENT = dict(student_fname='Ada', student_lname='Lovelace',
+               student_number='100001', contact_mobile='123456',
+               contact_email='ada@example.com')
+
+
+def version_of(page):
+    return re.search(r'name="version_id" type="hidden" value="(\d+)"',
+                     page.decode('utf-8')).group(1)
+
+
+@pytest.fixture
+def second_client(app, admin_client):
+    with app.app_context():
+        admin_id = Employee.query.filter_by(username='admin').one().id
+    client = app.test_client()
+    login(client, admin_id)
+    return client
+
+
+@pytest.mark.parametrize('model, values, url, changed', [
+    (Student, STUDENT, '/admin/students/edit/{}', 'student_fname'),
+    (Department, dict(name='Physics', description='Physics'),
+     '/admin/departments/edit/{}', 'name'),
+])
+def test_second_editor_gets_conflict(app, admin_client, second_client,
+                                     model, values, url, changed):
+    with app.app_context():
+        obj = model(**values)
+        db.session.add(obj)
+        db.session.commit()
+        url = url.format(obj.id)
+
+    # both editors open the form before either saves
+    first = dict(values, version_id=version_of(admin_client.get(url).data))
+    second = dict(values, version_id=version_of(second_client.get(url).data))
+    first[changed] = 'First'
+    second[changed] = 'Second'
+
+    assert admin_client.post(url, data=first).status_code == 302
+    response = second_client.post(url, data=second)
+
+    assert response.status_code == 200
+    page = response.data.decode('utf-8')
+    assert 'Someone else changed this record' in page
+    assert re.search(r'<td> First </td>\s*<td> Second </td>', page)
+    # only the field both editors changed is listed
+    assert len(re.findall(r'<tr>\s*<td>', page)) == 1
+    with app.app_context():
+        saved = model.query.one()
+        assert getattr(saved, changed) == 'First'
+        assert saved.version_id == 2
+
+    # submitting the conflict form again overwrites the first edit
+    second['version_id'] = version_of(response.data)
+    assert second_client.post(url, data=second).status_code == 302
+    with app.app_context():
+        assert getattr(model.query.one(), changed) == 'Second'
+
+
+def test_commit_between_load_and_save_is_detected(app):
+    with app.app_context():
+        db.session.add(Department(name='Physics', description='Physics'))
+        db.session.commit()
+
+    loaded = threading.Event()
+    committed = threading.Event()
+
+    def other_editor():
+        loaded.wait()
+        with app.app_context():
+            department = Department.query.one()
+            department.name = 'Chemistry'
+            db.session.commit()
+        committed.set()
+
+    thread = threading.Thread(target=other_editor)
+    thread.start()
+
+    with app.test_request_context(method='POST', data=dict(
+            name='Biology', description='Physics', version_id='1')):
+        department = Department.query.one()
+        form = DepartmentForm(obj=department)
+        loaded.set()
+        committed.wait()
+        # the form and the loaded row both still say version 1
+        conflict = save_edit(department, form, ('name', 'description'))
+
+    thread.join()
+    assert conflict == [('Name', 'Chemistry', 'Biology')]
+    with app.app_context():
+        department = Department.query.one()
+        assert (department.name, department.version_id) == ('Chemistry', 2)
@@ -0,0 +1,92 @@
+# tests/test_deletes.py
+
+import os
+import tracemalloc
+
+import flask_migrate
+import pytest
+from sqlalchemy import text
+
+from app import db
+from app.models import Department, Employee, Role
+from tests.utils import QueryCounter
+
+CHILDREN = 5000
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                          'migrations')
+
+
+def add_employees(parent_column, parent_id):
+    db.session.bulk_insert_mappings(Employee, [
+        {'email': 'e{}@example.com'.format(i), 'username': 'e{}'.format(i),
+         parent_column: parent_id}
+        for i in range(CHILDREN)])
+    db.session.commit()
+
+
+@pytest.mark.parametrize('model, column, url', [
+    (Department, 'department_id', '/admin/departments/delete/{}'),
+    (Role, 'role_id', '/admin/roles/delete/{}'),
+])
+def test_delete_does_not_load_children(app, admin_client, model, column,
+                                       url):
+    with app.app_context():
+        parent = model(name='Big', description='Many employees')
+        db.session.add(parent)
+        db.session.commit()
+        parent_id = parent.id
+        add_employees(column, parent_id)
+        engine = db.engine
+
+    tracemalloc.start()
+    try:
+        with QueryCounter(engine) as queries:
+            response = admin_client.get(url.format(parent_id))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert response.status_code == 302
+    # no per-child statements and no child rows held in memory
+    assert queries.count < 15
+    assert peak < 1024 * 1024
+
+    with app.app_context():
+        assert model.query.get(parent_id) is None
+        remaining = Employee.query.filter(
+            getattr(Employee, column).isnot(None)).count()
+        assert remaining == 0
+        assert Employee.query.count() == CHILDREN + 1
+
+
+def test_delete_missing_parent_is_404(admin_client):
+    response = admin_client.get('/admin/departments/delete/999')
+    assert response.status_code == 404
+
+
+def test_migration_adds_on_delete_to_existing_schema(app):
+    with app.app_context():
+        db.drop_all()
+        flask_migrate.upgrade(directory=MIGRATIONS, revision='e65b91ec157f')
+        db.session.execute(text(
+            "INSERT INTO departments (id, name) VALUES (1, 'Physics')"))
+        db.session.execute(text(
+            "INSERT INTO employees (id, username, department_id) "
+            "VALUES (1, 'grace', 1)"))
+        db.session.commit()
+
+        # the baseline keys have no ON DELETE rule
+        with pytest.raises(Exception):
+            db.session.execute(text("DELETE FROM departments WHERE id = 1"))
+            db.session.commit()
+        db.session.rollback()
+
+        flask_migrate.upgrade(directory=MIGRATIONS, revision='8d2df0296c51')
+        db.session.execute(text("DELETE FROM departments WHERE id = 1"))
+        db.session.commit()
+        department_id = db.session.execute(text(
+            "SELECT department_id FROM employees WHERE id = 1")).scalar()
+        assert department_id is None
+
+        flask_migrate.downgrade(directory=MIGRATIONS, revision='e65b91ec157f')
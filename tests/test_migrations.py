@@ -0,0 +1,25 @@
+# tests/test_migrations.py
+
+import os
+
+import flask_migrate
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+
+from app import db
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                          'migrations')
+
+
+def test_head_matches_models(app):
+    with app.app_context():
+        db.drop_all()
+        flask_migrate.upgrade(directory=MIGRATIONS)
+
+        with db.engine.connect() as connection:
+            context = MigrationContext.configure(connection)
+            assert compare_metadata(context, db.metadata) == []
+
+        flask_migrate.downgrade(directory=MIGRATIONS, revision='base')
+        assert db.engine.table_names() == ['alembic_version']
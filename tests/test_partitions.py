@@ -0,0 +1,203 @@
+# tests/test_partitions.py
+
+import os
+
+import pytest
+from flask_login import login_user
+from sqlalchemy import text
+
+from app import changes, db, partitions, transcripts
+from app.admin.views import faculty_counts
+from app.models import Course, Department, Employee, Enrolment, Student
+
+
+@pytest.fixture
+def settings(tmp_path):
+    return dict(FACULTY_DATABASES=dict(
+        (faculty, 'sqlite:///{}'.format(tmp_path / '{}.db'.format(faculty))
+         ) for faculty in ('Science', 'Arts')))
+
+
+@pytest.fixture
+def employees(app):
+    """
+    {faculty: id} of an employee in a department of each faculty, and of
+    one without a department for None
+    """
+    with app.app_context():
+        metadata = partitions.faculty_metadata(db.metadata)
+        for faculty in partitions.faculties():
+            metadata.create_all(partitions.engine_for(faculty))
+
+        ids = {}
+        for faculty in ('Science', 'Arts', None):
+            department = None
+            if faculty is not None:
+                department = Department(name=faculty, description='',
+                                        faculty_name=faculty)
+                db.session.add(department)
+            employee = Employee(email='{}@example.com'.format(faculty),
+                                username=str(faculty), password='secret',
+                                department=department)
+            db.session.add(employee)
+            db.session.commit()
+            ids[faculty] = employee.id
+        return ids
+
+
+def student_names(faculty):
+    with partitions.engine_for(faculty).connect() as connection:
+        return sorted(name for name, in connection.execute(
+            text('SELECT student_fname FROM students')))
+
+
+def add_student_as(app, employee_id, name, enrolment_id=None):
+    with app.test_request_context():
+        login_user(Employee.query.get(employee_id))
+        db.session.add(Student(student_fname=name,
+                               enrolment_id=enrolment_id))
+        db.session.commit()
+
+
+def test_rows_are_routed_by_employee_department(app, employees):
+    for faculty, employee_id in employees.items():
+        add_student_as(app, employee_id, 'Of {}'.format(faculty))
+
+    with app.app_context():
+        assert student_names('Science') == ['Of Science']
+        assert student_names('Arts') == ['Of Arts']
+        assert student_names(None) == ['Of None']
+        # shared tables stay in the shared database
+        assert Employee.query.count() == 3
+
+
+def test_admin_works_in_the_chosen_faculty(app, admin_client, employees):
+    assert admin_client.get('/admin/faculties/use/Arts').status_code == 302
+    response = admin_client.post('/admin/students/add', data=dict(
+        student_fname='Ada', student_lname='Lovelace',
+        contact_mobile='123456', contact_email='ada@example.com'))
+
+    assert response.status_code == 302
+    with app.app_context():
+        assert student_names('Arts') == ['Ada']
+        assert student_names('Science') == []
+
+
+def test_student_numbers_are_unique_across_faculties(app, admin_client,
+                                                     employees):
+    student = dict(student_fname='Ada', student_lname='Lovelace',
+                   contact_mobile='123456', contact_email='ada@example.com')
+    admin_client.get('/admin/faculties/use/Science')
+    response = admin_client.post('/admin/students/add',
+                                 data=dict(student, student_number='555'))
+    assert response.status_code == 302
+
+    admin_client.get('/admin/faculties/use/Arts')
+    response = admin_client.post('/admin/students/add',
+                                 data=dict(student, student_number='555'))
+    assert response.status_code == 200
+    assert b'This student number is already in use.' in response.data
+
+    response = admin_client.post('/admin/students/add',
+                                 data=dict(student, student_number='556'))
+    assert response.status_code == 302
+    response = admin_client.post('/admin/students/edit/1', data=dict(
+        student, student_number='555', version_id='1'))
+    assert response.status_code == 200
+    assert b'This value is already in use.' in response.data
+
+    with app.app_context():
+        for faculty, numbers in (('Science', [555]), ('Arts', [556])):
+            with partitions.engine_for(faculty).connect() as connection:
+                assert [number for number, in connection.execute(text(
+                    'SELECT student_number FROM students'))] == numbers
+
+
+def test_fan_out_merges_every_faculty(app, admin_client, employees):
+    add_student_as(app, employees['Science'], 'One')
+    add_student_as(app, employees['Science'], 'Two')
+    add_student_as(app, employees['Arts'], 'Three')
+    add_student_as(app, employees[None], 'Four')
+
+    with app.app_context():
+        counts = partitions.fan_out(faculty_counts)
+    assert counts == {'Science': dict(students=2, courses=0),
+                      'Arts': dict(students=1, courses=0),
+                      None: dict(students=1, courses=0)}
+
+    page = admin_client.get('/admin/faculties')
+    assert page.status_code == 200
+    assert b'Science' in page.data and b'Arts' in page.data
+    assert b'Shared database' in page.data
+    assert b'<strong>4</strong>' in page.data
+
+
+def test_change_feed_covers_every_faculty(app, employees):
+    # both students get id 1 in their own database
+    add_student_as(app, employees['Science'], 'Curie')
+    add_student_as(app, employees['Arts'], 'Austen')
+
+    with app.app_context():
+        page, cursor, more = changes.changes_since('0')
+        students = sorted((change['faculty'], change['row']['id'],
+                           change['row']['student_fname'])
+                          for change in page if change['table'] == 'students')
+        assert students == [('Arts', 1, 'Austen'), ('Science', 1, 'Curie')]
+        assert changes.parse_cursor(cursor)['science'] == 1
+        assert changes.parse_cursor(cursor)['arts'] == 1
+        assert not more
+
+        assert changes.changes_since(cursor) == ([], cursor, False)
+
+    add_student_as(app, employees['Arts'], 'Woolf')
+    with app.app_context():
+        page, cursor, _ = changes.changes_since(cursor)
+        assert [(change['faculty'], change['seq'],
+                 change['row']['student_fname']) for change in page] == [
+                     ('Arts', 2, 'Woolf')]
+
+
+def test_deleting_a_department_clears_it_in_every_faculty(app, admin_client,
+                                                         employees):
+    with app.app_context():
+        department = Department(name='Library', description='')
+        db.session.add(department)
+        db.session.commit()
+        department_id = department.id
+        for faculty in ('Science', 'Arts'):
+            with partitions.use_faculty(faculty):
+                db.session.add(Course(course_name=faculty,
+                                      department_id=department_id))
+                db.session.commit()
+        _, cursor, _ = changes.changes_since('0')
+
+    response = admin_client.get(
+        '/admin/departments/delete/{}'.format(department_id))
+
+    assert response.status_code == 302
+    with app.app_context():
+        for faculty in ('Science', 'Arts'):
+            with partitions.engine_for(faculty).connect() as connection:
+                assert connection.execute(text(
+                    'SELECT department_id FROM courses')).scalar() is None
+        page, _, _ = changes.changes_since(cursor)
+        assert sorted((change['faculty'], change['row']['department_id'])
+                      for change in page if change['table'] == 'courses') == [
+                          ('Arts', None), ('Science', None)]
+
+
+def test_transcripts_cover_every_faculty(app, employees, tmp_path):
+    with app.app_context():
+        enrolment = Enrolment(year_enrol='2018')
+        db.session.add(enrolment)
+        db.session.commit()
+        enrolment_id = enrolment.id
+    for faculty in ('Science', 'Arts', None):
+        add_student_as(app, employees[faculty], str(faculty), enrolment_id)
+
+    output = str(tmp_path / 'transcripts')
+    with app.app_context():
+        assert transcripts.generate(app, output, processes=1) == 3
+    assert sorted(os.listdir(output)) == [
+        'arts-transcript-1.html', 'science-transcript-1.html',
+        'transcript-1.html']
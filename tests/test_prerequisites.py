@@ -0,0 +1,105 @@
+# tests/test_prerequisites.py
+
+import random
+import threading
+import time
+
+import pytest
+
+from app import db, prerequisites
+from app.models import Module, ModuleClosure
+
+
+def add_modules(count):
+    modules = [Module(module_name='M{}'.format(i)) for i in range(count)]
+    db.session.add_all(modules)
+    db.session.commit()
+    return [module.id for module in modules]
+
+
+def count_paths(edges, start, goal):
+    if start == goal:
+        return 1
+    return sum(count_paths(edges, prerequisite, goal)
+               for module, prerequisite in edges if module == start)
+
+
+def expected_closure(ids, edges):
+    closure = {}
+    for module in ids:
+        for prerequisite in ids:
+            if module != prerequisite:
+                paths = count_paths(edges, module, prerequisite)
+                if paths:
+                    closure[(module, prerequisite)] = paths
+    return closure
+
+
+def stored_closure():
+    return dict(((row.module_id, row.prerequisite_id), row.paths)
+                for row in ModuleClosure.query)
+
+
+def test_closure_matches_edges_after_random_edits(app):
+    rng = random.Random(7)
+    with app.app_context():
+        ids = add_modules(12)
+        edges = set()
+        for _ in range(80):
+            module, prerequisite = rng.sample(ids, 2)
+            if (module, prerequisite) in edges:
+                prerequisites.remove_prerequisite(module, prerequisite)
+                edges.discard((module, prerequisite))
+            else:
+                try:
+                    prerequisites.add_prerequisite(module, prerequisite)
+                except ValueError:
+                    assert count_paths(edges, prerequisite, module)
+                    continue
+                edges.add((module, prerequisite))
+            db.session.commit()
+            assert stored_closure() == expected_closure(ids, edges)
+
+
+def test_cycle_is_rejected(app):
+    with app.app_context():
+        a, b, c = add_modules(3)
+        prerequisites.add_prerequisite(a, b)
+        prerequisites.add_prerequisite(b, c)
+        db.session.commit()
+
+        with pytest.raises(ValueError):
+            prerequisites.add_prerequisite(c, a)
+        with pytest.raises(ValueError):
+            prerequisites.add_prerequisite(a, a)
+
+
+def test_concurrent_opposite_edges_cannot_both_commit(app):
+    with app.app_context():
+        a, b = add_modules(2)
+
+    results = {}
+
+    def add(module, prerequisite, delay):
+        with app.app_context():
+            try:
+                prerequisites.add_prerequisite(module, prerequisite)
+                # hold the edit open so the other thread has to wait
+                time.sleep(delay)
+                db.session.commit()
+                results[module] = 'added'
+            except ValueError:
+                db.session.rollback()
+                results[module] = 'cycle'
+
+    first = threading.Thread(target=add, args=(a, b, 0.5))
+    second = threading.Thread(target=add, args=(b, a, 0))
+    first.start()
+    time.sleep(0.1)
+    second.start()
+    first.join()
+    second.join()
+
+    assert results == {a: 'added', b: 'cycle'}
+    with app.app_context():
+        assert stored_closure() == {(a, b): 1}
@@ -0,0 +1,63 @@
+# tests/test_refdata.py
+
+import threading
+
+import pytest
+
+from app import db, refdata
+from app.models import Department
+
+
+def add_department(app, name):
+    """
+    Commit a department from another thread, so it goes through a
+    session of its own
+    """
+    def run():
+        with app.app_context():
+            db.session.add(Department(name=name, description=name))
+            db.session.commit()
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    thread.join()
+
+
+def test_lookup_maps_are_read_only(app):
+    with app.app_context():
+        db.session.add(Department(name='Physics', description='Physics'))
+        db.session.commit()
+        departments = refdata.current().departments
+
+        with pytest.raises(TypeError):
+            departments[1] = None
+        with pytest.raises(AttributeError):
+            departments.pop(1)
+        assert departments[1].name == 'Physics'
+
+
+def test_commit_in_another_session_invalidates_cache(app):
+    with app.app_context():
+        data = refdata.current()
+        assert len(data.departments) == 0
+        session = db.session()
+
+    add_department(app, 'Physics')
+
+    with app.app_context():
+        assert db.session() is not session
+        data = refdata.current()
+        assert [row.name for row in data.departments.values()] == ['Physics']
+
+
+def test_cache_is_checked_once_per_request(app, admin_client):
+    add_department(app, 'Physics')
+    assert b'Physics' in admin_client.get('/admin/departments').data
+
+    with app.test_request_context():
+        before = refdata.current()
+        add_department(app, 'Chemistry')
+        # the request keeps the snapshot it started with
+        assert refdata.current() is before
+
+    assert b'Chemistry' in admin_client.get('/admin/departments').data
@@ -0,0 +1,96 @@
+# tests/test_streaming.py
+
+import gzip
+import zlib
+
+import brotli
+import pytest
+
+from app import db
+from app.models import Student
+
+STUDENTS = 300
+
+
+@pytest.fixture
+def students(app):
+    with app.app_context():
+        db.session.execute(Student.__table__.insert(), [
+            dict(student_fname='First{}'.format(i), student_lname='Last',
+                 student_number=100000 + i)
+            for i in range(STUDENTS)])
+        db.session.commit()
+
+
+def get_chunks(client, url, encoding=None):
+    headers = {'Accept-Encoding': encoding} if encoding else {}
+    response = client.get(url, headers=headers, buffered=False)
+    try:
+        chunks = [chunk for chunk in response.response if chunk]
+    finally:
+        response.close()
+    return response, chunks
+
+
+def test_list_page_is_streamed_in_chunks(admin_client, students):
+    response, chunks = get_chunks(admin_client, '/admin/students')
+
+    assert response.is_streamed
+    assert 'Content-Encoding' not in response.headers
+    assert len(chunks) > 1
+    # the page header goes out before any student row
+    assert b'<html' in chunks[0]
+    assert b'First0<' not in chunks[0]
+    body = b''.join(chunks)
+    assert body.count(b'Last') >= STUDENTS
+    assert body.rstrip().endswith(b'</html>')
+
+
+@pytest.mark.parametrize('encoding, decompress', [
+    ('gzip', gzip.decompress),
+    ('br', brotli.decompress),
+])
+def test_streamed_page_is_compressed(admin_client, students, encoding,
+                                     decompress):
+    _, plain = get_chunks(admin_client, '/admin/students')
+    response, chunks = get_chunks(admin_client, '/admin/students', encoding)
+
+    assert response.headers['Content-Encoding'] == encoding
+    assert 'Accept-Encoding' in response.vary
+    assert 'Content-Length' not in response.headers
+    assert len(chunks) > 1
+    assert decompress(b''.join(chunks)) == b''.join(plain)
+
+
+def test_gzip_chunks_decode_as_they_arrive(admin_client, students):
+    _, chunks = get_chunks(admin_client, '/admin/students', 'gzip')
+
+    decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    # every chunk is flushed, so the first one already holds the header
+    assert b'<html' in decoder.decompress(chunks[0])
+
+
+@pytest.mark.parametrize('encoding, decompress', [
+    ('gzip', gzip.decompress),
+    ('br', brotli.decompress),
+])
+def test_buffered_response_is_compressed(admin_client, students, encoding,
+                                         decompress):
+    plain = admin_client.get('/admin/changes?limit=50')
+    response = admin_client.get('/admin/changes?limit=50',
+                                headers={'Accept-Encoding': encoding})
+
+    assert response.headers['Content-Encoding'] == encoding
+    assert 'Accept-Encoding' in response.vary
+    assert int(response.headers['Content-Length']) == len(response.data)
+    assert len(response.data) < len(plain.data)
+    assert decompress(response.data) == plain.data
+
+
+def test_small_response_is_not_compressed(admin_client):
+    response = admin_client.get('/admin/changes?limit=1',
+                                headers={'Accept-Encoding': 'gzip'})
+
+    assert len(response.data) < 500
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' in response.vary
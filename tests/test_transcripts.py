@@ -0,0 +1,108 @@
+# tests/test_transcripts.py
+
+import os
+import zipfile
+
+import pytest
+
+from app import db, transcripts
+from app.models import Enrolment, Student
+
+STUDENTS = 7
+
+
+class Killed(Exception):
+    pass
+
+
+def kill_after_first_chunk(rendered, total):
+    raise Killed()
+
+
+@pytest.fixture
+def students(app):
+    with app.app_context():
+        enrolment = Enrolment(year_enrol='2018')
+        db.session.add(enrolment)
+        db.session.flush()
+        db.session.add_all(
+            Student(student_fname='S{}'.format(i), student_lname='Student',
+                    enrolment_id=enrolment.id)
+            for i in range(STUDENTS))
+        db.session.commit()
+        return [transcripts.document_name(id, 'html')
+                for id, in db.session.query(Student.id)]
+
+
+def generate(app, output, progress=None):
+    with app.app_context():
+        return transcripts.generate(app, output, processes=1, chunk_size=3,
+                                    progress=progress)
+
+
+def test_directory_resumes_after_kill(app, students, tmp_path):
+    output = str(tmp_path / 'out')
+    with pytest.raises(Killed):
+        generate(app, output, kill_after_first_chunk)
+    assert sorted(os.listdir(output)) == sorted(students[:3])
+
+    # a document half written when the process died
+    partial = os.path.join(output, students[3] + transcripts.PARTIAL)
+    with open(partial, 'wb') as document:
+        document.write(b'<html')
+
+    assert generate(app, output) == STUDENTS - 3
+    names = [name for name in os.listdir(output)
+             if not name.endswith(transcripts.PARTIAL)]
+    assert sorted(names) == sorted(students)
+    with open(os.path.join(output, students[3]), 'rb') as document:
+        assert document.read().rstrip().endswith(b'</html>')
+
+
+def test_zip_resumes_after_kill(app, students, tmp_path):
+    output = str(tmp_path / 'out.zip')
+    with pytest.raises(Killed):
+        generate(app, output, kill_after_first_chunk)
+    assert not os.path.exists(output)
+
+    # an archive cut off before its central directory was written
+    parts = output + '.parts'
+    with open(os.path.join(parts, 'part-9.zip' + transcripts.PARTIAL),
+              'wb') as part:
+        part.write(b'PK\x03\x04truncated')
+
+    assert generate(app, output) == STUDENTS - 3
+    assert not os.path.exists(parts)
+    with zipfile.ZipFile(output) as archive:
+        assert archive.testzip() is None
+        assert sorted(archive.namelist()) == sorted(students)
+
+    # nothing left to do, and the finished archive is kept as it is
+    assert generate(app, output) == 0
+    with zipfile.ZipFile(output) as archive:
+        assert sorted(archive.namelist()) == sorted(students)
+
+
+def test_letters_share_the_transcript_pass(app, students, tmp_path):
+    output = str(tmp_path / 'out')
+    with app.app_context():
+        assert transcripts.generate(app, output, processes=1,
+                                    chunk_size=3) == STUDENTS
+        # only the letters are still missing
+        assert transcripts.generate(
+            app, output, processes=1, chunk_size=3,
+            documents=('transcript', 'letter')) == STUDENTS
+        ids = [id for id, in db.session.query(Student.id)]
+
+    letters = [transcripts.document_name(id, 'html', document='letter')
+               for id in ids]
+    assert sorted(os.listdir(output)) == sorted(students + letters)
+    with open(os.path.join(output, letters[0]), 'rb') as letter:
+        assert b'Confirmation of Enrolment' in letter.read()
+
+
+def test_unknown_document_type_is_rejected(app, tmp_path):
+    with app.app_context():
+        with pytest.raises(ValueError):
+            transcripts.generate(app, str(tmp_path / 'out'),
+                                 documents=('certificate',))
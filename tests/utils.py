@@ -0,0 +1,37 @@
+# tests/utils.py
+
+from sqlalchemy import event
+
+
+def login(client, employee_id):
+    """
+    Log the test client in as an employee
+    """
+    with client.session_transaction() as session:
+        session['_user_id'] = str(employee_id)
+        session['_fresh'] = True
+
+
+class QueryCounter(object):
+    """
+    Count the statements sent to an engine inside a with block
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context,
+                executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, 'before_cursor_execute', self._record)
+
+    @property
+    def count(self):
+        return len(self.statements)